@@ -2,9 +2,14 @@
 This script produces gamma distributions for each of the input parameters
 (priors) that will be tested with ABC. These values are then used in the model
 calls for ICHEC.
+
+The priors are written to one binary table (.npy), with a row id and a column
+for each parameter, which ichec_sweep.py reads directly, i.e.:
+    python3 ../../ichec_sweep.py sep gamma_priors.npy --start 0 --stop 1000
 """
 
 from scipy.stats import gamma
+import numpy as np
 import os
 
 speed_dist = gamma.rvs(size=10000, a=2)
@@ -15,24 +20,12 @@ sep_dist = gamma.rvs(size=10000, a=2)
 # path = "/Users/user/Desktop/Local/Mackerel/fish-shoaling-model/ICHEC_files/taskfarm"  # desktop
 path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/fish-shoaling-model/ICHEC_files/taskfarm"  # laptop
 
-# Write text files with each value of the distribution on its own line
-file = open(os.path.join(path, r"speed_priors.txt"), "w")
-
-for i in speed_dist:
-    file.write(str(i) + "\n")
-
-file.close()
-
-file = open(os.path.join(path, r"vision_priors.txt"), "w")
-
-for i in vision_dist:
-    file.write(str(i) + "\n")
-
-file.close()
-
-file = open(os.path.join(path, r"sep_priors.txt"), "w")
-
-for i in sep_dist:
-    file.write(str(i) + "\n")
+# Write a table with a row for each value of the distributions
+priors = np.zeros(len(speed_dist), dtype=[("row", np.int64), ("speed", np.float64),
+                                          ("vision", np.float64), ("separation", np.float64)])
+priors["row"] = np.arange(len(speed_dist))
+priors["speed"] = speed_dist
+priors["vision"] = vision_dist
+priors["separation"] = sep_dist
 
-file.close()
+np.save(os.path.join(path, r"gamma_priors.npy"), priors)
@@ -1,8 +1,13 @@
 """
 Script for generating the task list to run the taskfarm on the ICHEC cluster.
-The tasks are run based on a .txt file where each run is a task that passes in
-a unique value for the the prior that is varying in that script (speed, vision
-or separation) and has its own data output.
+The values of the priors for every run are written once to a shared binary
+table (priors.npy), with a row id and a column for each parameter. The tasks
+are run based on a .txt file where each task is a chunk of rows of the table
+that ichec_sweep.py runs in one process, with its own data output. The chunks
+are sized so that each task takes about task_seconds, from the time of one run
+of the sweep: given on the command line, or timed here with the first row of
+the priors. Usage, i.e.:
+    python3 create_tasks.py --seconds-per-run 1.5
 
 The distribution I'm using is a Gamma distribution because it needs to be non-
 negative. I'm playing around with the parameters, but "a" is what the
@@ -11,13 +16,24 @@ distribution is centered around, "loc" is the bottom end of the distribution
 spread.
 """
 
-from scipy.stats import gamma
-import numpy as np
+import argparse
 import os
+import sys
+import time
+
+import numpy as np
+
+# ichec_sweep.py is at the top of the repository, as in the tasks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+parser = argparse.ArgumentParser(description="Write the prior table and taskfarm task list.")
+parser.add_argument("--seconds-per-run", type=float,
+                    help="time of one run of the sweep (timed with one run if not given)")
+args = parser.parse_args()
 
 runs = 100000  # TODO: Change for number of runs of the model
 
-# Prior distributions - other factors
+# Prior distributions - other factors (gamma is from scipy.stats)
 # speed_dist = gamma.rvs(size=runs, a=2, loc=0, scale=1)
 # vision_dist = gamma.rvs(size=runs, a=5, loc=0, scale=1)
 # sep_dist = gamma.rvs(size=runs, a=2, loc=0, scale=1)
@@ -40,59 +56,51 @@ match_dist = np.random.uniform(low=0, high=1, size=runs)
 # match_dist = [0.5] * runs
 
 
-# Same length as priors; for unique names for the output files
-names = range(runs)
+# TODO: Choose which set of parameters to vary - a sweep in ichec_sweep.py:
+# "allfactors", "alldata" or "nnd" (all parameters), "boidfactors" (cohere,
+# separate, match), "otherfactors" (speed, vision, separation), or "speed",
+# "vision" or "sep" (one parameter). Each reads its own columns of the table.
+sweep = "allfactors"
+
+output = "../output/11Dec2020"  # TODO: make sure date is correct
+
+task_seconds = 30 * 60  # time wanted per task
 
 # path = "/Users/user/Desktop/Local/Mackerel/fish-shoaling-model/ICHEC_files/taskfarm"  # desktop
 path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/fish-shoaling-model/ICHEC_files/taskfarm"  # laptop
 
-# Write files with values from distributions above & unique output names
+# Write the prior table, shared by all of the tasks, as a binary (.npy) table
+# with a row id and a column for each parameter
+priors = np.zeros(runs, dtype=[("row", np.int64), ("speed", np.float64),
+                               ("vision", np.float64), ("separation", np.float64),
+                               ("cohere", np.float64), ("separate", np.float64),
+                               ("match", np.float64)])
+priors["row"] = np.arange(runs)
+for name, dist in zip(priors.dtype.names[1:], (speed_dist, vision_dist, sep_dist,
+                                               cohere_dist, separate_dist, match_dist)):
+    priors[name] = dist
+# np.save(os.path.join(path, r"priors.npy"), priors)
+np.save("priors.npy", priors)  # for cluster
+
+# Each task runs a chunk of rows of the prior table in one process. The size of
+# the chunks comes from the time per run of the model and the time each task
+# should take, so that there are a few hundred long tasks rather than a task
+# for every run. Runs on the cluster can be slower than here, so time a few
+# runs there and give --seconds-per-run if the tasks run over.
+seconds_per_run = args.seconds_per_run
+if seconds_per_run is None:
+    from ichec_sweep import SWEEPS, run_model
+    start = time.time()
+    run_model(sweep, priors["row"][0], [priors[name][0] for name in SWEEPS[sweep]["vary"]])
+    seconds_per_run = time.time() - start
+    print("{}: {:.2f} seconds per run".format(sweep, seconds_per_run))
+chunk = max(int(task_seconds / seconds_per_run), 1)
+
+# Write a task for each chunk of rows, with unique output names
 # file = open(os.path.join(path, r"modelruns.txt"), "w")
 file = open("modelruns.txt", "w")  # for cluster
-
-# For when only one parameter varies at a time --------------------------------
-# [file.write("python3 ../../ichec_run_speed.py " + str(i)
-#             + " > ../output/16Apr2020/speed_output" + str(j)
-#             + ".txt \n") for i, j in zip(speed_dist, names)]
-#
-# [file.write("python3 ../../ichec_run_vision.py " + str(i)
-#             + " > ../output/16Apr2020/vision_output" + str(j)
-#             + ".txt \n") for i, j in zip(vision_dist, names)]
-#
-# [file.write("python3 ../../ichec_run_sep.py " + str(i)
-#             + " > ../output/16Apr2020/sep_output" + str(j)
-#             + ".txt \n") for i, j in zip(sep_dist, names)]
-
-# TODO: Choose which set of parameters to vary
-# 1. For varying cohere, separate, dist ---------------------------------------
-# [file.write("python3 ../../ichec_run_boidfactors.py " + str(c) + " " + str(s) + " " + str(m)
-#             + " > ../output/29May2020/output" + str(n)  # TODO: make sure date is correct
-#             + ".txt \n") for c, s, m, n in zip(cohere_dist, separate_dist, match_dist, names)]
-
-# 2. For varying speed, vision, separation ------------------------------------
-# [file.write("python3 ../../ichec_run_otherfactors.py " + str(speed) + " " + str(vis) + " " + str(sep)
-#             + " > ../output/01Jun2020/output" + str(n)  # TODO: make sure date is correct
-#             + ".txt \n") for speed, vis, sep, n in zip(speed_dist, vision_dist, sep_dist, names)]
-
-# 3. For varying all parameters -----------------------------------------------
-[file.write("python3 ../../ichec_run_allfactors.py " + str(speed) + " " + str(vis) + " " + str(sep)
-            + " " + str(c) + " " + str(s) + " " + str(m)
-            + " > ../output/11Dec2020/output" + str(n)  # TODO: make sure date is correct
-            + ".txt \n") for speed, vis, sep, c, s, m, n in zip(speed_dist, vision_dist, sep_dist,
-                                                                cohere_dist, separate_dist, match_dist, names)]
-
-# 4. For printing all of the data for each step in each run -------------------
-# [file.write("python3 ../../ichec_run_alldata.py " + str(speed) + " " + str(vis) + " " + str(sep)
-#             + " " + str(c) + " " + str(s) + " " + str(m)
-#             + " > ../output/08Jun2020_alldata/output" + str(n)  # TODO: make sure name is correct
-#             + ".txt \n") for speed, vis, sep, c, s, m, n in zip(speed_dist, vision_dist, sep_dist,
-#                                                                 cohere_dist, separate_dist, match_dist, names)]
-
-# # 5. For running the model with only NND collected ----------------------------
-# [file.write("python3 ../../ichec_run_nnd.py " + str(speed) + " " + str(vis) + " " + str(sep)
-#             + " " + str(c) + " " + str(s) + " " + str(m)
-#             + " > ../output/08Dec2020_nnd/output" + str(n)  # TODO: make sure date is correct
-#             + ".txt \n") for speed, vis, sep, c, s, m, n in zip(speed_dist, vision_dist, sep_dist,
-#                                                                 cohere_dist, separate_dist, match_dist, names)]
-
+for n, start in enumerate(range(0, runs, chunk)):
+    file.write("python3 ../../ichec_sweep.py {} priors.npy --start {} --stop {} "
+               "--output {}/output{}.npy\n".format(sweep, start, min(start + chunk, runs),
+                                                   output, n))
 file.close()
@@ -14,5 +14,5 @@
 cd $SLURM_SUBMIT_DIR
 
 module load taskfarm
-export TASKFARM_GROUP=200
+# Each task is a chunk of runs (see create_tasks.py), so tasks aren't grouped
 taskfarm modelruns.txt
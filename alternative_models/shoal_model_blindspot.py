@@ -171,10 +171,7 @@ class ShoalModel(Model):
             self.schedule.add(fish)
 
         self.datacollector = DataCollector(
-            model_reporters={"Polarization": polar,
-                             "Nearest Neighbour Distance": nnd,
-                             "Shoal Area": area,
-                             "Mean Distance from Centroid": centroid_dist})
+            model_reporters=SummaryStats().reporters())
 
     def step(self):
         self.datacollector.collect(self)
@@ -31,6 +31,7 @@ from mesa.datacollection import DataCollector
 from mesa.space import ContinuousSpace
 
 from data_collectors import *
+from spatial_index import NeighbourTree
 
 
 # Todo: Change neighbours from defined by radius to simply nearest x number
@@ -38,18 +39,20 @@ from data_collectors import *
 
 def neighbours(model):
     """
-    Finds 6 nearest neighbours to the target agent, used instead of vision
+    Finds 6 nearest neighbours to every agent, used instead of vision
     to circumvent the polarity issue and follow newer research suggesting
     that a topological, rather than geometric, approach to neighbour selection
-    is more accurate (Mann 2011).
+    is more accurate (Mann 2011). Uses a periodic k-d tree, so neighbours are
+    found across the edges of the toroidal space. Returns the distances to
+    and indices of the neighbours, one row per agent. A model with a spatial
+    context for each step (see ShoalModel.spatial_context) shares its tree
+    and query with the data collectors.
     """
+    if hasattr(model, "spatial_context"):
+        return model.spatial_context().query(6)
     fish = np.asarray([agent.pos for agent in model.schedule.agents])
-    fish_tree = KDTree(fish)
-    for target in fish:
-        nb = fish_tree.query(x=target, k=6)  # includes target agent @ dist = 0
-        dist = list(nb[0])  # select dist not neighbor # from .query output
-        dist.pop(0)  # removes closest - target agent @ dist = 0
-    return nb
+    fish_tree = NeighbourTree(fish, model.space.size, model.space.torus)
+    return fish_tree.query(k=6)
 
 
 class Fish(Agent):
@@ -28,15 +28,25 @@ disrupts the structure and dynamics of fish shoals.
 More functions will be added as more methods for conceptualizing the shoal are
 found in the literature.
 
-These are used in shoal_model.py and elsewhere.
+These are used in shoal_model.py and elsewhere. The fish positions and
+velocities are read once per step from the model's fish registry
+(ShoalModel.fish_arrays) where there is one, rather than each function
+searching the schedule for the agents tagged as "fish". Whole trajectories
+are recorded into arrays with the TrajectoryRecorder, and density heatmaps
+built up as the model runs with the DensityHeatmap.
 """
 
 import numpy as np
 import math
 import itertools
-from scipy.spatial import KDTree, ConvexHull
+import weakref
+from scipy.spatial import ConvexHull
+try:
+    from scipy.spatial import QhullError
+except ImportError:  # scipy older than 1.8
+    from scipy.spatial.qhull import QhullError
 from scipy.ndimage import center_of_mass
-from statsmodels.robust.scale import mad
+from spatial_index import NeighbourTree
 
 
 def test(model):
@@ -48,6 +58,19 @@ def test(model):
     return fish, obstruct
 
 
+def fish_arrays(model):
+    """
+    Positions and velocities of the fish as (n_fish, 2) arrays of floats.
+    Read from the model's fish registry (ShoalModel.fish_arrays) if it has
+    one, or else from the agents in the schedule tagged as "fish".
+    """
+    if hasattr(model, "fish_arrays"):
+        return model.fish_arrays()
+    fish = [agent for agent in model.schedule.agents if agent.tag == "fish"]
+    return (np.array([agent.pos for agent in fish], dtype=float).reshape(-1, 2),
+            np.array([agent.velocity for agent in fish], dtype=float).reshape(-1, 2))
+
+
 def polar(model):
     """
     Computes median absolute deviation (MAD) from the mean velocity of the
@@ -56,38 +79,86 @@ def polar(model):
     the arc tangent of y/x. The function used pays attention to the sign of
     the input to make sure that the correct quadrant for the angle is determined.
 
-    Collects velocity from ONLY the agents tagged as "fish".
+    The MAD is scaled to match the standard deviation of a normal
+    distribution, as in statsmodels' mad (see median_abs_deviation). The
+    angles come from np.arctan2, which can differ from math.atan2 in the last
+    bit, so values can differ from the statsmodels version by a few 1e-15.
+
+    Collects velocity from ONLY the fish.
     """
-    velocity_x = [agent.velocity[0] for agent in model.schedule.agents
-                  if agent.tag == "fish"]
-    velocity_y = [agent.velocity[1] for agent in model.schedule.agents
-                  if agent.tag == "fish"]
-    angle = []
-    for (y, x) in zip(velocity_y, velocity_x):
-        a = math.atan2(y, x)
-        angle.append(a)
-    return mad(np.asarray(angle), center=np.median)
+    pos, velocity = fish_arrays(model)
+    return polar_array(velocity)
 
 
-def nnd(model):
+def polar_resultant(model):
+    """
+    Mean resultant length of the fish headings, a circular statistic for
+    polarization: the length of the mean of the unit heading vectors. 1 means
+    that all fish are heading the same way, and it approaches 0 as headings
+    spread out. Unlike the MAD of the angles in polar(), it doesn't depend on
+    where the angles wrap around (-pi to pi), so a shoal heading left (where
+    the angles are near both pi and -pi) isn't counted as disorganised.
+
+    Collects velocity from ONLY the fish.
+    """
+    pos, velocity = fish_arrays(model)
+    return polar_resultant_array(velocity)
+
+
+def nnd(model, k=5, periodic=False, workers=1):
     """
     Computes the average nearest neighbour distance for each agent as another
     measure of cohesion. Method finds & averages the nearest neighbours
     using a KDTree, a machine learning concept for clustering or
-    compartmentalizing data. Right now, the 5 nearest neighbors are considered.
+    compartmentalizing data. By default, the 5 nearest neighbors are
+    considered.
+
+    The neighbours of every fish are found with one query of the tree (see
+    nearest_neighbour_distance). Distances are plain Euclidean distances, as
+    in the summary statistics used for the ABC so far, for every model. If
+    periodic, they instead wrap around the edges of a toroidal space, which
+    changes the statistic for fish near the edges, and the k-d tree & nearest
+    neighbours of the model's spatial context for the step
+    (ShoalModel.spatial_context) are used and shared if it has one. workers >
+    1 runs the query on several threads. Use functools.partial to give other
+    options to a DataCollector.
+
+    Collects position from ONLY the fish.
+    """
+    if periodic and hasattr(model, "spatial_context"):
+        context = model.spatial_context()
+        dist, idx = context.query(min(k, len(context.pos) - 1), workers)
+        return np.mean(dist)
+    fish, velocity = fish_arrays(model)
+    size = model.space.size if periodic else None
+    return nearest_neighbour_distance(fish, k, size, workers)
 
-    Collects position from ONLY the agents tagged as "fish".
+
+def nearest_neighbour_distance(pos, k=5, size=None, workers=1):
+    """
+    Mean distance to the k nearest neighbours of each point in an (n, 2)
+    array, averaged over all points, from one batched query of a k-d tree.
+    Distances wrap around the edges of a space of the given (width, height)
+    size, or are plain Euclidean distances if size is None. If there are k or
+    fewer points, all of the other points are used.
+    """
+    pos = np.asarray(pos, dtype=float)
+    k = min(k, len(pos) - 1)
+    torus = size is not None
+    tree = NeighbourTree(pos, size if torus else np.ones(2), torus)
+    dist, idx = tree.query(k=k, workers=workers)
+    return np.mean(dist)
+
+
+def convex_hull(model):
     """
-    fish = np.asarray([agent.pos for agent in model.schedule.agents
-                       if agent.tag == "fish"])
-    fish_tree = KDTree(fish)
-    means = []
-    for me in fish:
-        neighbours = fish_tree.query(x=me, k=6)  # includes agent @ dist = 0
-        dist = list(neighbours[0])  # select dist from .query output
-        dist.pop(0)  # removes closest agent - itself @ dist = 0
-        means.append(sum(dist) / len(dist))
-    return sum(means) / len(means)
+    The scipy.spatial ConvexHull of the fish, shared for the step from the
+    model's spatial context (ShoalModel.spatial_context) if it has one.
+    """
+    if hasattr(model, "spatial_context"):
+        return model.spatial_context().hull()
+    pos, velocity = fish_arrays(model)  # numpy array of floats - two columns (x,y)
+    return ConvexHull(pos)
 
 
 def area(model):
@@ -96,53 +167,45 @@ def area(model):
     measure of shoal area. Uses the area variable from the scipy.spatial
     ConvexHull function.
 
-    Collects position from ONLY the agents tagged as "fish".
+    Collects position from ONLY the fish.
     """
-    # Data needs to be a numpy array of floats - two columns (x,y)
-    pos_x = np.asarray([agent.pos[0] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    pos_y = np.asarray([agent.pos[1] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    return ConvexHull(np.column_stack((pos_x, pos_y))).area
+    return convex_hull(model).area
 
 
-def centroid_dist(model):
+def centroid_dist(model, circular=False):
     """
     Extracts xy coordinates for each agent, finds the centroid, and then
-    calculates the mean distance of each agent from the centroid.
+    calculates the mean distance of each agent from the centroid. Distances
+    wrap around the edges of a toroidal space, as in space.get_distance.
+
+    The centroid is the mean x and y position, unless circular is True, when
+    it is the circular mean along each axis of a toroidal space (see
+    torus_centroid). This keeps the centroid with the shoal when the shoal
+    is split across an edge of the space.
 
-    Collects position from ONLY the agents tagged as "fish".
+    Collects position from ONLY the fish.
     """
-    pos_x = np.asarray([agent.pos[0] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    pos_y = np.asarray([agent.pos[1] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    mean_x, mean_y = np.mean(pos_x), np.mean(pos_y)
-    centroid = (mean_x, mean_y)
-    pos = [agent.pos for agent in model.schedule.agents]
-    cent_dist = []
-    for p in pos:
-        dist = model.space.get_distance(p, centroid)
-        cent_dist = np.append(cent_dist, dist)
-    return np.mean(cent_dist)
+    pos, velocity = fish_arrays(model)
+    size = model.space.size if model.space.torus else None
+    return centroid_dist_array(pos, size, circular)
 
 
 def positions(model):
-    """ Extracts xy coordinates for each agent tagged as "fish"."""
-    pos = [(agent.pos[0], 50-agent.pos[1]) for agent in model.schedule.agents
-           if agent.tag == "fish"]
+    """ Extracts xy coordinates for each fish."""
+    pos, velocity = fish_arrays(model)
+    pos = [(x, 50-y) for (x, y) in pos.tolist()]
     pos = list(itertools.chain(*pos))  # creates lists of positions, rather than tuples
     return pos
 
 
 def heading(model):
     """
-    Extracts heading of each agent tagged as "fish". Heading is determined from
+    Extracts heading of each fish. Heading is determined from
     velocity in the agent creation, even though there's no movement element The
     velocity is a tuple - (x, y), here transformed into radians here..
     """
-    head = [agent.velocity for agent in model.schedule.agents
-            if agent.tag == "fish"]
+    pos, head = fish_arrays(model)
+    head = head.tolist()
     degrees = [math.atan2(x, -y) for (x, y) in head]  # from x,y to radians with y inverted
     return degrees
 
@@ -153,8 +216,7 @@ def center_mass(model):
     body has a uniform density. Calculated with the scipy.ndimage.center_of_mass
     function.
     """
-    pos = np.asarray([agent.pos for agent in model.schedule.agents
-                      if agent.tag == "fish"])
+    pos, velocity = fish_arrays(model)
     center = center_of_mass(pos)
     return np.asarray(center)
 
@@ -163,7 +225,11 @@ def nn_perp_d(model):
     """
     Mean nearest neighbour distance perpendicular to the direction of travel,
     i.e. how far a part the fish are, side to side.
+
+    This and nn_para_d, nn_bearing & heading_diff share one nearest neighbour
+    search per step (see NeighbourStats).
     """
+    return neighbour_stats(model)["NN Perpendicular Distance"]
 
 
 def nn_para_d(model):
@@ -171,6 +237,7 @@ def nn_para_d(model):
     Mean nearest neighbour distance parallel to the direction of travel, i.e.
     how far apart the fish are in front or behind each other.
     """
+    return neighbour_stats(model)["NN Parallel Distance"]
 
 
 def nn_bearing(model):
@@ -179,6 +246,16 @@ def nn_bearing(model):
     directly to the side of the focal fish. 0 degrees = neighbour directly
     ahead; 180 = neighbour directly behind.
     """
+    return neighbour_stats(model)["NN Bearing"]
+
+
+def neighbour_rebuilds(model):
+    """
+    Number of times the model has searched for the neighbours of every fish
+    from scratch (see ShoalModel.neighbour_rebuilds). For checking how often
+    the Verlet list is rebuilt.
+    """
+    return model.neighbour_rebuilds
 
 
 def heading_diff(model):
@@ -186,3 +263,660 @@ def heading_diff(model):
     Mean heading difference between nearest neighbours as a measure of
     alignment. 0 degrees = high alignment; 180 = opposite alignment.
     """
+    return neighbour_stats(model)["Heading Difference"]
+
+
+# ARRAY VERSIONS --------------------------------------------------------------
+# The same statistics calculated straight from arrays of fish positions and
+# velocities, shaped (..., n_fish, 2). Any leading dimensions are separate
+# shoals (i.e. replicates of a model run) and one value is returned for each.
+# Giving the size of the space as (width, height) makes distances wrap around
+# its edges, as they do in the toroidal ShoalModel.
+
+# Scale factor for the MAD to match the standard deviation of a normal
+# distribution (scipy.stats.norm.ppf(0.75)), the default in statsmodels' mad.
+MAD_NORMAL = 0.6744897501960817
+
+
+def median_abs_deviation(a, axis=-1):
+    """
+    Median absolute deviation from the median along an axis, divided by
+    MAD_NORMAL. Gives exactly the same result as statsmodels'
+    mad(a, center=np.median), without needing statsmodels.
+    """
+    centre = np.median(a, axis=axis, keepdims=True)
+    return np.median(np.fabs(a - centre) / MAD_NORMAL, axis=axis)
+
+
+def polar_array(velocity):
+    """
+    Median absolute deviation of the fish headings (in radians) from their
+    median heading, as in polar().
+    """
+    angle = np.arctan2(velocity[..., 1], velocity[..., 0])
+    return median_abs_deviation(angle)
+
+
+def polar_resultant_array(velocity):
+    """
+    Mean resultant length of the fish headings, as in polar_resultant().
+    """
+    angle = np.arctan2(velocity[..., 1], velocity[..., 0])
+    return np.hypot(np.cos(angle).mean(axis=-1), np.sin(angle).mean(axis=-1))
+
+
+def nnd_array(pos, size=None, k=5):
+    """
+    Mean distance to the k nearest neighbours of each fish, averaged over the
+    shoal, as in nnd(). Checks the distance between every pair of fish, so is
+    meant for small shoals.
+    """
+    deltas = np.abs(pos[..., np.newaxis, :, :] - pos[..., :, np.newaxis, :])
+    if size is not None:
+        deltas = np.minimum(deltas, size - deltas)
+    dist = np.sqrt(deltas[..., 0] ** 2 + deltas[..., 1] ** 2)
+    nearest = np.partition(dist, k, axis=-1)[..., :k + 1]  # includes itself @ dist = 0
+    return nearest.sum(axis=-1).mean(axis=-1) / k
+
+
+def area_array(pos):
+    """
+    Convex hull of each shoal, using the area variable from ConvexHull as in
+    area().
+    """
+    shoals = pos.reshape((-1,) + pos.shape[-2:])
+    return np.array([ConvexHull(p).area for p in shoals]).reshape(pos.shape[:-2])
+
+
+def hull_candidates(pos, seed=None):
+    """
+    Indices of the points in an (n, 2) array that could be on its convex
+    hull. The hull of a few points known to be on or near the full hull (the
+    extreme points in x, y, x + y and x - y, as in the Akl-Toussaint
+    heuristic, plus any seed indices, i.e. the hull vertices from the last
+    step) is found first, and every point strictly inside it is left out, as
+    it can't be a vertex of the full hull. For a large shoal this leaves only
+    a thin band of points around the edge.
+    """
+    pos = np.asarray(pos, dtype=float)
+    x, y = pos[:, 0].copy(), pos[:, 1].copy()  # contiguous, for speed
+    extremes = [x.argmin(), x.argmax(), y.argmin(), y.argmax()]
+    diagonal = x + y
+    extremes += [diagonal.argmin(), diagonal.argmax()]
+    np.subtract(x, y, out=diagonal)
+    extremes += [diagonal.argmin(), diagonal.argmax()]
+    if seed is not None:
+        extremes = np.concatenate((extremes, seed))
+    extremes = np.unique(extremes)
+    if len(extremes) < 3:
+        return np.arange(len(pos))
+    try:
+        inner = ConvexHull(pos[extremes])
+    except QhullError:  # the points are in a line
+        return np.arange(len(pos))
+    # A point is strictly inside the inner hull if it is inside every edge
+    scale = max(np.abs(x).max(), np.abs(y).max()) * 1e-12
+    inside = np.ones(len(pos), dtype=bool)
+    edge = np.empty(len(pos))
+    below = np.empty(len(pos), dtype=bool)
+    for a, b, offset in inner.equations:
+        np.multiply(x, a, out=edge)
+        np.multiply(y, b, out=diagonal)
+        edge += diagonal
+        np.less(edge, -offset - scale, out=below)
+        inside &= below
+    return np.flatnonzero(~inside)
+
+
+def hull_perimeter_bounds(pos, directions=8):
+    """
+    Lower and upper bounds on the perimeter of the convex hull of an (n, 2)
+    array of points, from its extreme points in a number of equally spaced
+    directions. The extreme points make a polygon inside the hull, and the
+    lines through them at right angles to each direction make one around it,
+    so the true perimeter is between their perimeters. The gap between them
+    shrinks as the number of directions increases, but each direction is
+    another pass over the points.
+    """
+    pos = np.asarray(pos, dtype=float)
+    x, y = pos[:, 0].copy(), pos[:, 1].copy()  # contiguous, for speed
+    angles = np.linspace(0, 2 * np.pi, directions, endpoint=False)
+    normals = np.stack((np.cos(angles), np.sin(angles)), axis=1)
+    extreme = np.empty(directions, dtype=int)
+    projection = np.empty(len(pos))
+    y_part = np.empty(len(pos))
+    for d, (a, b) in enumerate(normals):
+        np.multiply(x, a, out=projection)
+        np.multiply(y, b, out=y_part)
+        projection += y_part
+        extreme[d] = projection.argmax()
+    inner = pos[extreme]
+    support = (inner * normals).sum(axis=1)
+    inner_perimeter = np.linalg.norm(np.roll(inner, -1, axis=0) - inner, axis=1).sum()
+    # Corners of the outer polygon, where the lines for neighbouring directions meet
+    lines = np.stack((normals, np.roll(normals, -1, axis=0)), axis=1)
+    offsets = np.stack((support, np.roll(support, -1)), axis=1)
+    corners = np.linalg.solve(lines, offsets[..., np.newaxis])[..., 0]
+    outer_perimeter = np.linalg.norm(np.roll(corners, -1, axis=0) - corners, axis=1).sum()
+    return inner_perimeter, outer_perimeter
+
+
+def approximate_hull_area(pos, tolerance=0.05, max_directions=32):
+    """
+    The "area" of the convex hull as from area() (scipy's ConvexHull.area,
+    which for points in 2D is the perimeter of the hull), to within a
+    relative error of tolerance, from hull_perimeter_bounds. The middle of the
+    bounds is returned, starting from 8 directions and doubling them until
+    the bounds are close enough. If more than max_directions would be needed,
+    the exact hull is found instead. 8 directions are usually within 5% for a
+    shoal, and cost less than the exact hull; much tighter tolerances don't.
+    """
+    pos = np.asarray(pos, dtype=float)
+    directions = 8
+    while directions <= max_directions:
+        inner, outer = hull_perimeter_bounds(pos, directions)
+        if outer - inner <= 2 * tolerance * inner:
+            return (inner + outer) / 2
+        directions *= 2
+    return ConvexHull(pos[hull_candidates(pos)]).area
+
+
+def centroid_dist_array(pos, size=None, circular=False):
+    """
+    Mean distance of each fish from the centroid (mean position) of the shoal,
+    as in centroid_dist(). If circular, the centroid is the circular mean
+    along each axis (torus_centroid), which needs the size of the space.
+    """
+    if circular:
+        assert size is not None, "the circular centroid needs the size of the space"
+        centroid = torus_centroid(pos, size)
+    else:
+        centroid = pos.mean(axis=-2)
+    deltas = np.abs(pos - centroid[..., np.newaxis, :])
+    if size is not None:
+        deltas = np.minimum(deltas, size - deltas)
+    return np.sqrt(deltas[..., 0] ** 2 + deltas[..., 1] ** 2).mean(axis=-1)
+
+
+def torus_centroid(pos, size):
+    """
+    Centroid of each shoal in a toroidal space of the given (width, height).
+    Each axis is treated as a circle and the centroid is the circular mean of
+    the positions along it, so a shoal split across an edge of the space has
+    its centroid in the shoal rather than in the middle of the space.
+    """
+    size = np.asarray(size, dtype=float)
+    angle = pos * (2 * np.pi / size)
+    mean_angle = np.arctan2(np.sin(angle).mean(axis=-2), np.cos(angle).mean(axis=-2))
+    return (mean_angle * (size / (2 * np.pi))) % size
+
+
+def neighbour_metrics_array(pos, velocity, neighbour, size=None):
+    """
+    The Herbert-Read et al. (2017) nearest neighbour measures for one shoal,
+    given the index of each fish's nearest neighbour. The offset to the
+    neighbour (the shortest way around a toroidal space, if size is given) is
+    projected on to each fish's direction of travel. Returns the means over
+    the shoal of:
+        1. the distance to the neighbour perpendicular to the direction of
+           travel (side to side),
+        2. the distance parallel to it (in front or behind),
+        3. the bearing to the neighbour, in degrees from straight ahead,
+        4. the difference between the headings of the fish and its
+           neighbour, in degrees.
+    """
+    offset = pos[neighbour] - pos
+    if size is not None:
+        offset -= size * np.round(offset / size)
+    heading = velocity / np.linalg.norm(velocity, axis=1)[:, np.newaxis]
+    parallel = (offset * heading).sum(axis=1)
+    perpendicular = heading[:, 0] * offset[:, 1] - heading[:, 1] * offset[:, 0]
+    other = heading[neighbour]
+    cos_diff = (heading * other).sum(axis=1)
+    sin_diff = heading[:, 0] * other[:, 1] - heading[:, 1] * other[:, 0]
+    return (np.mean(np.fabs(perpendicular)),
+            np.mean(np.fabs(parallel)),
+            np.mean(np.degrees(np.arctan2(np.fabs(perpendicular), parallel))),
+            np.mean(np.degrees(np.arctan2(np.fabs(sin_diff), cos_diff))))
+
+
+# FUSED REPORTERS -------------------------------------------------------------
+class StepStats:
+    """
+    A set of statistics calculated together once per step, sharing the work
+    of reading the fish and searching for neighbours. Subclasses give the
+    names of the statistics and calculate(model), which returns a dictionary
+    of them.
+
+    The DataCollector still needs one reporter per column, so reporters()
+    gives a function for each statistic that reads the shared values:
+        DataCollector(model_reporters=SummaryStats().reporters())
+    """
+    names = ()
+
+    def __init__(self):
+        self.values = None
+        self._model = None  # weak reference, so a new model can't pass for a freed one
+        self._step = None
+
+    def __call__(self, model):
+        """
+        Returns a dictionary of the statistics for the model's current step,
+        calculating them only the first time they're asked for.
+        """
+        if (self._model is None or self._model() is not model or
+                self._step != model.schedule.steps):
+            self.values = self.calculate(model)
+            self._model = weakref.ref(model)
+            self._step = model.schedule.steps
+        return self.values
+
+    def calculate(self, model):
+        raise NotImplementedError
+
+    def reporter(self, name):
+        """
+        A reporter function for the DataCollector that returns one of the
+        statistics.
+        """
+        def report(model):
+            return self(model)[name]
+        report.__name__ = name
+        return report
+
+    def reporters(self):
+        """
+        Model reporters for the DataCollector, one for each statistic.
+        """
+        return {name: self.reporter(name) for name in self.names}
+
+
+class SummaryStats(StepStats):
+    """
+    The four summary statistics used for the ABC (polarization, nearest
+    neighbour distance, shoal area and mean distance from centroid). The fish
+    positions and velocities are read once, and the shoal area uses the
+    model's spatial context for the step (ShoalModel.spatial_context) if it
+    has one. The values and column names
+    are the same as from polar(), nnd(), area() and centroid_dist().
+    """
+    names = ("Polarization",
+             "Nearest Neighbour Distance",
+             "Shoal Area",
+             "Mean Distance from Centroid")
+
+    def __init__(self, k=5, workers=1, hull=None):
+        """
+        Args:
+            k: number of nearest neighbours for the nearest neighbour distance.
+            workers: number of threads for the nearest neighbour query.
+            hull: a HullArea to find the shoal area with, for large shoals,
+                  rather than the full convex hull of the step.
+        """
+        super().__init__()
+        self.k = k
+        self.workers = workers
+        self.hull = hull
+
+    def calculate(self, model):
+        """
+        Calculates all four statistics from one read of the fish arrays.
+        """
+        pos, velocity = fish_arrays(model)
+        size = model.space.size if model.space.torus else None
+        return {"Polarization": polar_array(velocity),
+                "Nearest Neighbour Distance": nnd(model, self.k, workers=self.workers),
+                "Shoal Area": (convex_hull(model).area if self.hull is None
+                               else self.hull.calculate(pos)),
+                "Mean Distance from Centroid": centroid_dist_array(pos, size)}
+
+
+class NeighbourStats(StepStats):
+    """
+    The Herbert-Read et al. (2017) measures of shoal structure (nn_perp_d,
+    nn_para_d, nn_bearing and heading_diff), all from one search for each
+    fish's nearest neighbour (see neighbour_metrics_array). Uses the model's
+    k-d tree for the step if it has one, so neighbours are found around the
+    edges of a toroidal space.
+    """
+    names = ("NN Perpendicular Distance",
+             "NN Parallel Distance",
+             "NN Bearing",
+             "Heading Difference")
+
+    def calculate(self, model):
+        """
+        Finds the nearest neighbour of every fish with one query, then
+        calculates all four measures.
+        """
+        pos, velocity = fish_arrays(model)
+        if hasattr(model, "neighbour_tree"):
+            tree = model.neighbour_tree()
+        else:
+            tree = NeighbourTree(pos, model.space.size, model.space.torus)
+        dist, neighbour = tree.nearest()
+        size = model.space.size if model.space.torus else None
+        return dict(zip(self.names, neighbour_metrics_array(pos, velocity, neighbour, size)))
+
+
+# Shared by nn_perp_d, nn_para_d, nn_bearing & heading_diff so that using them
+# as separate reporters still only finds the nearest neighbours once per step.
+neighbour_stats = NeighbourStats()
+
+
+# INCREMENTAL HULL ------------------------------------------------------------
+class HullArea:
+    """
+    A reporter for the shoal area (as from area()) for large shoals. The
+    hull changes little from one step to the next, so the fish on the hull
+    at the last step are used with the extreme points to leave out the fish
+    that are well inside the shoal (see hull_candidates), and the hull is
+    only found for the rest. This gives the same value as area(). With a
+    tolerance, the area is instead approximated to within that relative
+    error (see approximate_hull_area). Fewer than three fish, or fish all in
+    a line, have no hull and an area of 0. Use as a model reporter, i.e.:
+        DataCollector(model_reporters={"Shoal Area": HullArea()})
+    or give it to SummaryStats(hull=HullArea()).
+    """
+    # Most hull vertices from the last step to use, as each is another pass
+    # over the fish in hull_candidates. An even spread of them around the
+    # hull leaves out nearly as many fish as all of them would.
+    max_seed = 32
+
+    def __init__(self, tolerance=None):
+        """
+        Args:
+            tolerance: relative error allowed for an approximate area, or None
+                       for the exact area.
+        """
+        self.tolerance = tolerance
+        self.vertices = None  # indices of the fish on the hull at the last step
+
+    def __call__(self, model):
+        pos, velocity = fish_arrays(model)
+        return self.calculate(pos)
+
+    def calculate(self, pos):
+        """
+        The area of the hull of an (n_fish, 2) array of positions.
+        """
+        if self.tolerance is not None:
+            return approximate_hull_area(pos, self.tolerance)
+        seed = self.vertices
+        if seed is not None and seed.max(initial=0) >= len(pos):  # the number of fish changed
+            seed = None
+        if seed is not None and len(seed) > self.max_seed:
+            seed = seed[::-(-len(seed) // self.max_seed)]  # vertices are in order around the hull
+        self.vertices = None
+        if len(pos) < 3:
+            return 0.0
+        candidates = hull_candidates(pos, seed)
+        try:
+            hull = ConvexHull(pos[candidates])
+        except QhullError:  # the fish are in a line or all in one place
+            return 0.0
+        self.vertices = candidates[hull.vertices]
+        return hull.area
+
+
+# ONLINE SUMMARY --------------------------------------------------------------
+# Short names of the data collectors, for the summary statistic columns used
+# in the ABC (i.e. "cent_min", ..., "area_std"), in the order they're given.
+SHORT_NAMES = {"Mean Distance from Centroid": "cent",
+               "Nearest Neighbour Distance": "nnd",
+               "Polarization": "polar",
+               "Shoal Area": "area"}
+
+# The names the ICHEC run scripts gave the same columns, by position in the
+# DataCollector of ShoalModel (Polarization, Nearest Neighbour Distance, Shoal
+# Area, Mean Distance from Centroid), so that "cent" is the polarization and
+# so on. The R scripts for the ABC read the columns by these names, so they
+# are used for all output read by R (the summary statistics, unless
+# SHORT_NAMES are asked for, and the per-step files of data_batch.py and
+# mutli_run.py).
+ICHEC_NAMES = {"Polarization": "cent",
+               "Nearest Neighbour Distance": "nnd",
+               "Shoal Area": "polar",
+               "Mean Distance from Centroid": "area"}
+
+
+class OnlineSummary:
+    """
+    A stand-in for the DataCollector that keeps only the min, max, mean and
+    standard deviation of each reporter over the steps collected, updated
+    each step (Welford's method for the mean and variance), rather than a
+    list of every value. The summary row for a run can then be had without
+    making a dataframe of every step. Use it in place of the model's
+    DataCollector, i.e.:
+        model.datacollector = OnlineSummary(model.datacollector.model_reporters)
+    """
+    stats = ("min", "max", "mean", "std")
+
+    def __init__(self, model_reporters, burn_in=0, names=ICHEC_NAMES):
+        """
+        Args:
+            model_reporters: dictionary of names and reporter functions, as
+                             for the DataCollector.
+            burn_in: steps at the beginning not to include, for models that
+                     collect data on every step.
+            names: short names for the columns of the summary, in order:
+                   ICHEC_NAMES, as the existing output, or SHORT_NAMES.
+        """
+        self.model_reporters = dict(model_reporters)
+        self.burn_in = burn_in
+        self.names = names
+        n = len(self.model_reporters)
+        self.count = 0
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.mean = np.zeros(n)
+        self._sum_squares = np.zeros(n)  # sum of squared differences from the mean
+
+    def collect(self, model):
+        """
+        Adds the values of the reporters at the model's current step.
+        """
+        if model.schedule.steps < self.burn_in:
+            return
+        values = np.array([reporter(model) for reporter in self.model_reporters.values()],
+                          dtype=float)
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._sum_squares += delta * (values - self.mean)
+        np.minimum(self.min, values, out=self.min)
+        np.maximum(self.max, values, out=self.max)
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation (with n - 1, as pandas .std()).
+        """
+        if self.count < 2:
+            return np.full(len(self.mean), np.nan)
+        return np.sqrt(self._sum_squares / (self.count - 1))
+
+    def summary(self):
+        """
+        The summary statistics as a dictionary, with the columns named and
+        ordered as in the ICHEC run scripts: the min of each data collector,
+        then the max, mean and standard deviation (i.e. "cent_min", ...,
+        "area_std"). Reporters without a short name use their full name.
+        """
+        index = {name: i for i, name in enumerate(self.model_reporters)}
+        names = ([name for name in self.names if name in index] +
+                 [name for name in index if name not in self.names])
+        values = {"min": self.min, "max": self.max, "mean": self.mean, "std": self.std}
+        return {"{}_{}".format(self.names.get(name, name), stat): values[stat][index[name]]
+                for stat in self.stats for name in names}
+
+
+# TRAJECTORIES ----------------------------------------------------------------
+class TrajectoryRecorder:
+    """
+    A stand-in for the DataCollector that records the position and velocity
+    of every fish, at every stride-th step after the burn-in, into
+    preallocated (records, n_fish, 2) arrays rather than a list per step (as
+    the positions and heading reporters give). With a path, the arrays are
+    memory-mapped .npy files ("<path>_positions.npy" and
+    "<path>_velocities.npy") written as the model runs, so long runs of large
+    shoals don't have to fit in memory. Use it in place of the model's
+    DataCollector, i.e.:
+        model.datacollector = TrajectoryRecorder(model.n_fish, steps=400)
+    """
+    def __init__(self, n_fish, steps, stride=1, burn_in=0, dtype=float, path=None):
+        """
+        Args:
+            n_fish: number of fish in the model.
+            steps: number of steps the model will be run for.
+            stride: record every stride-th step.
+            burn_in: steps at the beginning not to record.
+            dtype: type of the arrays, i.e. np.float32 for half the memory.
+            path: file path (without extension) to memory-map the arrays to.
+        """
+        assert stride >= 1, "stride must be at least 1"
+        self.stride = stride
+        self.burn_in = burn_in
+        self.path = path
+        shape = (len(range(burn_in, steps, stride)), n_fish, 2)
+        if path is None:
+            self.positions = np.empty(shape, dtype=dtype)
+            self.velocities = np.empty(shape, dtype=dtype)
+        else:
+            self.positions = np.lib.format.open_memmap(path + "_positions.npy", mode="w+",
+                                                       dtype=dtype, shape=shape)
+            self.velocities = np.lib.format.open_memmap(path + "_velocities.npy", mode="w+",
+                                                        dtype=dtype, shape=shape)
+        self.steps = np.full(shape[0], -1)  # model step of each record
+        self.count = 0
+
+    def collect(self, model):
+        """
+        Records the positions and velocities of the fish at the model's
+        current step, if it is one to be recorded.
+        """
+        step = model.schedule.steps
+        if step < self.burn_in or (step - self.burn_in) % self.stride:
+            return
+        assert self.count < len(self.steps), "more steps than the recorder has room for"
+        pos, velocity = fish_arrays(model)
+        self.positions[self.count] = pos
+        self.velocities[self.count] = velocity
+        self.steps[self.count] = step
+        self.count += 1
+
+    def get_positions(self):
+        """ (records, n_fish, 2) array of the positions recorded so far. """
+        return self.positions[:self.count]
+
+    def get_velocities(self):
+        """ (records, n_fish, 2) array of the velocities recorded so far. """
+        return self.velocities[:self.count]
+
+    def get_headings(self):
+        """
+        (records, n_fish) array of the heading of each fish in radians, with y
+        inverted, as in the heading reporter.
+        """
+        velocity = self.get_velocities()
+        return np.arctan2(velocity[..., 0], -velocity[..., 1])
+
+    def save(self, path, compressed=False):
+        """
+        Saves the steps, positions and velocities recorded so far to a .npz
+        file. Memory-mapped recordings are flushed to their .npy files.
+        """
+        if self.path is not None:
+            self.positions.flush()
+            self.velocities.flush()
+        savez = np.savez_compressed if compressed else np.savez
+        savez(path, steps=self.steps[:self.count], positions=self.get_positions(),
+              velocities=self.get_velocities())
+
+
+# HEATMAPS --------------------------------------------------------------------
+class DensityHeatmap:
+    """
+    A stand-in for the DataCollector that adds the positions of the fish at
+    each step collected to a 2D histogram of the space, rather than keeping
+    every position, so a density heatmap (i.e. for comparison with acoustic
+    data) is built up as the model runs. Optionally also a histogram of the
+    tilt of the fish (the angle of their velocity from horizontal towards y,
+    from -pi/2 to pi/2) and the total tilt of the fish in each
+    cell, for the mean tilt across the space. Use it in place of the model's
+    DataCollector, i.e.:
+        model.datacollector = DensityHeatmap(50, 50, bins=25, burn_in=200)
+    The grids are indexed [x, y], as np.histogram2d, in model coordinates.
+    """
+    def __init__(self, width, height, bins=50, burn_in=0, stride=1, tilt_bins=None):
+        """
+        Args:
+            width, height: size of the model space.
+            bins: number of cells along x and y, or (x_bins, y_bins).
+            burn_in: steps at the beginning not to include.
+            stride: add every stride-th step.
+            tilt_bins: number of bins for the tilt histogram, if wanted.
+        """
+        assert stride >= 1, "stride must be at least 1"
+        self.size = np.array((width, height), dtype=float)
+        self.bins = np.broadcast_to(np.asarray(bins, dtype=int), (2,)).copy()
+        self.burn_in = burn_in
+        self.stride = stride
+        self.steps = 0  # number of steps added
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.tilt_edges = None
+        if tilt_bins is not None:
+            self.tilt_edges = np.linspace(-np.pi / 2, np.pi / 2, tilt_bins + 1)
+            self.tilt_counts = np.zeros(tilt_bins, dtype=np.int64)
+            self.tilt_sum = np.zeros(self.bins)
+
+    def collect(self, model):
+        """
+        Adds the fish at the model's current step, if it is one to be added.
+        """
+        step = model.schedule.steps
+        if step < self.burn_in or (step - self.burn_in) % self.stride:
+            return
+        pos, velocity = fish_arrays(model)
+        cells = np.floor(pos / self.size * self.bins).astype(int)
+        np.clip(cells, 0, self.bins - 1, out=cells)
+        cell_id = cells[:, 0] * self.bins[1] + cells[:, 1]
+        self.counts += np.bincount(cell_id, minlength=self.counts.size).reshape(self.bins)
+        if self.tilt_edges is not None:
+            tilt = np.arctan2(velocity[:, 1], np.abs(velocity[:, 0]))
+            self.tilt_counts += np.histogram(tilt, self.tilt_edges)[0]
+            self.tilt_sum += np.bincount(cell_id, tilt,
+                                         minlength=self.counts.size).reshape(self.bins)
+        self.steps += 1
+
+    def density(self):
+        """
+        Proportion of the fish in each cell, averaged over the steps added.
+        """
+        total = self.counts.sum()
+        return self.counts / total if total else self.counts.astype(float)
+
+    def mean_tilt(self):
+        """
+        Mean tilt of the fish in each cell, NaN where there were none.
+        """
+        assert self.tilt_edges is not None, "tilt_bins wasn't given"
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.tilt_sum / self.counts
+
+    def edges(self):
+        """
+        Edges of the cells along x and y, as from np.histogram2d.
+        """
+        return (np.linspace(0, self.size[0], self.bins[0] + 1),
+                np.linspace(0, self.size[1], self.bins[1] + 1))
+
+    def save(self, path):
+        """
+        Saves the grids to a .npz file.
+        """
+        grids = {"counts": self.counts, "steps": self.steps}
+        if self.tilt_edges is not None:
+            grids.update(tilt_counts=self.tilt_counts, tilt_edges=self.tilt_edges,
+                         tilt_sum=self.tilt_sum)
+        np.savez(path, **grids)
@@ -10,7 +10,15 @@ once.
 
 In this code, the model is run within a function that can be called as many
 times as needed. Then the means of each data collector are taken across all
-of the model runs, for each step of the model.
+of the model runs, for each step of the model. The columns are named as in
+the ICHEC output read by R (data_collectors.ICHEC_NAMES).
+
+With use_ensemble, all of the runs are instead made together as one
+ShoalEnsemble (see shoal_ensemble.py), which is much faster. It moves all of
+the fish at once (simultaneous activation, with the "arrays" engine), which
+changes the summary statistics from the random activation of ShoalModel (see
+activation_comparison.py), so it isn't a drop-in replacement for existing
+output.
 
 # Todo: find if there's some consistent amount of burn-in for shoal formation
 
@@ -24,8 +32,9 @@ Data are collected in the data_collectors.py script and are:
 """
 
 from shoal_model import *
+from shoal_ensemble import ShoalEnsemble
+from data_collectors import ICHEC_NAMES
 import pandas as pd
-import multiprocessing
 import time
 import os
 
@@ -35,12 +44,13 @@ path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data"  # for
 s = 300  # number of steps to run the model for each time
 runs = range(100)  # number of runs/iterations of the model for finding the mean
 burn_in = 100  # number of steps to exclude at the beginning as collective behaviour emerges
+use_ensemble = False  # run all of the runs as one ShoalEnsemble (simultaneous activation)
 
 
 def run_model(steps):
     """
     Runs the shoal model for a certain number of steps, returning a dataframe
-    with all of the data collectors.
+    with all of the data collectors after the burn-in.
     """
     model = ShoalModel(n_fish=20,
                        width=50,
@@ -54,28 +64,44 @@ def run_model(steps):
     for step in range(steps):
         model.step()  # run the model for certain number of steps
     data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return data_trim.T  # data transposed to make means calculation easier
+    return data.iloc[burn_in:, ]  # remove early runs
+
+
+def run_ensemble(steps):
+    """
+    Runs all replicates of the shoal model for a certain number of steps,
+    returning a dictionary with a (steps, runs) array for each data collector.
+    """
+    ensemble = ShoalEnsemble(replicates=len(runs),
+                             n_fish=20,
+                             width=50,
+                             height=50,
+                             speed=1,
+                             vision=4.6,
+                             separation=3.2,
+                             cohere=0.47,
+                             separate=0.31,
+                             match=0.65)
+    ensemble.run(steps, burn_in=burn_in)  # early steps are not collected
+    return ensemble.get_model_vars()
 
 
 # RUN MODELS MANY TIMES, FIND MEAN FOR EACH STEP, EXPORT ----------------------
-# Runs the model for as many times as defined above in "runs", using multiple
-# cores. Number of processes is set to 10, but can be reduced if other work
-# needs to be done on the computer that requires CPU space.
-# Also prints how long it took, for reference.
+# Runs the model for as many times as defined above in "runs", one after the
+# other or all at once as an ensemble. Also prints how long it took, for
+# reference.
 
 if __name__ == '__main__':
     start = time.time()
-    p = multiprocessing.Pool(processes=10)  # 10 processes seems to be a sweet spot
-    polar = pd.concat([run_model(s).iloc[0:1, ] for r in runs])
-    nnd = pd.concat([run_model(s).iloc[1:2, ] for r in runs])
-    area = pd.concat([run_model(s).iloc[2:3, ] for r in runs])
-    cent = pd.concat([run_model(s).iloc[3:4, ] for r in runs])
-    step_means = pd.concat([polar.mean(axis=0),
-                            nnd.mean(axis=0),
-                            area.mean(axis=0),
-                            cent.mean(axis=0)], axis=1)
-    step_means.columns = ["cent", "nnd", "polar", "area"]
+    if use_ensemble:
+        data = run_ensemble(s)
+        means = {name: data[name].mean(axis=1) for name in ICHEC_NAMES}
+    else:
+        run_data = [run_model(s) for r in runs]
+        means = {name: np.mean([run[name].values for run in run_data], axis=0)
+                 for name in ICHEC_NAMES}
+    step_means = pd.DataFrame({ICHEC_NAMES[name]: means[name] for name in ICHEC_NAMES},
+                              index=range(burn_in, s))
     print("Time taken = {} minutes".format((time.time() - start) / 60))  # print how long it took
 
 # Export data
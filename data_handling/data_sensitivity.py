@@ -73,7 +73,6 @@ def run_speed_model(speed):
     parameter values for that run, including the varying & fixed parameters so
     all dataframes can be stacked together.
     """
-    speed_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -82,14 +81,13 @@ def run_speed_model(speed):
                        separation=sep_fixed,
                        cohere=cohere_fixed,
                        separate=separate_fixed,
-                       match=match_fixed)
+                       match=match_fixed,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        speed_parameter.append(speed)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data["speed"] = speed_parameter  # add parameter value column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T
+    data["speed"] = speed  # add parameter value column
+    return pd.DataFrame(data.mean(axis=0)).T
 
 
 # Run the model as many times as there are parameter values, for # of steps in "s"
@@ -104,7 +102,6 @@ def run_vision_model(vision):
     with the parameter values for that run, including the varying & fixed
     parameters so all dataframes can be stacked together.
     """
-    vision_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -113,14 +110,13 @@ def run_vision_model(vision):
                        separation=sep_fixed,
                        cohere=cohere_fixed,
                        separate=separate_fixed,
-                       match=match_fixed)
+                       match=match_fixed,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        vision_parameter.append(vision)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data["vision"] = vision_parameter  # add vision column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+    data["vision"] = vision  # add vision column
+    return pd.DataFrame(data.mean(axis=0)).T  # return means of all columns & transposed
 
 
 # Run the model as many times as there are parameter values, for # of steps in "s"
@@ -135,7 +131,6 @@ def run_sep_model(separation):
     with the parameter values for that run, including the varying & fixed
     parameters so all dataframes can be stacked together.
     """
-    sep_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -144,14 +139,13 @@ def run_sep_model(separation):
                        separation=separation,
                        cohere=cohere_fixed,
                        separate=separate_fixed,
-                       match=match_fixed)
+                       match=match_fixed,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        sep_parameter.append(separation)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["separation"] = sep_parameter  # add separation column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+    data["separation"] = separation  # add separation column
+    return pd.DataFrame(data.mean(axis=0)).T  # return means of all columns & transposed
 
 # Run the model as many times as there are parameter values, for # of steps in "s"
 # sep_data = pd.concat([run_sep_model(s, i) for i in sep_dist])
@@ -165,7 +159,6 @@ def run_cohere_model(cohere):
     with the parameter values for that run, including the varying & fixed
     parameters so all dataframes can be stacked together.
     """
-    cohere_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -174,14 +167,13 @@ def run_cohere_model(cohere):
                        separation=sep_fixed,
                        cohere=cohere,
                        separate=separate_fixed,
-                       match=match_fixed)
+                       match=match_fixed,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        cohere_parameter.append(cohere)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["cohere"] = cohere_parameter  # add cohere column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+    data["cohere"] = cohere  # add cohere column
+    return pd.DataFrame(data.mean(axis=0)).T  # return means of all columns & transposed
 
 
 def run_separate_model(separate):
@@ -192,7 +184,6 @@ def run_separate_model(separate):
     with the parameter values for that run, including the varying & fixed
     parameters so all dataframes can be stacked together.
     """
-    separate_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -201,14 +192,13 @@ def run_separate_model(separate):
                        separation=sep_fixed,
                        cohere=cohere_fixed,
                        separate=separate,
-                       match=match_fixed)
+                       match=match_fixed,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        separate_parameter.append(separate)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["separate"] = separate_parameter  # add separate column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+    data["separate"] = separate  # add separate column
+    return pd.DataFrame(data.mean(axis=0)).T  # return means of all columns & transposed
 
 
 def run_match_model(match):
@@ -219,7 +209,6 @@ def run_match_model(match):
     with the parameter values for that run, including the varying & fixed
     parameters so all dataframes can be stacked together.
     """
-    match_parameter = []
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
@@ -228,14 +217,13 @@ def run_match_model(match):
                        separation=sep_fixed,
                        cohere=cohere_fixed,
                        separate=separate_fixed,
-                       match=match)
+                       match=match,
+                       burn_in=burn_in)  # early runs aren't collected
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        match_parameter.append(match)  # create list of parameter values tested
     data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["match"] = match_parameter  # add match column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+    data["match"] = match  # add match column
+    return pd.DataFrame(data.mean(axis=0)).T  # return means of all columns & transposed
 
 
 # MULTIPROCESSING -------------------------------------------------------------
@@ -16,8 +16,9 @@ import os
 path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data"  # for laptop
 
 n = 300  # number of fish
+steps = 400  # number of steps to run the model for
 
-# Collect the data from a single run with x number of steps into a dataframe
+# Collect the data from a single run with x number of steps into arrays
 model = ShoalModel(n_fish=n,
                    width=50,
                    height=50,
@@ -27,44 +28,24 @@ model = ShoalModel(n_fish=n,
                    cohere=0.25,
                    separate=0.025,
                    match=0.3)
-for i in range(400):
+model.datacollector = TrajectoryRecorder(n, steps)  # record positions & headings
+for i in range(steps):
     model.step()
-data = model.datacollector.get_model_vars_dataframe()
-
-# Separate data from data collectors into numpy arrays so they can be accessed more easily
-np_data = np.asarray(data)
-
-# Separate position & heading data
-positions = np_data[:, 1]
-headings = np_data[:, 0]
 
 # Create unique names for each fish
 list_fish = ["fish" + str(i) for i in range(1, (n + 1))]
 
-# Manage position data --------------------------------------------------------
-# Flatten positions so it is more accessible & add column names
-p = positions.flatten()  # remove one set of brackets & make a dataframe
-pos_df = pd.DataFrame(p.flatten())  # remove one set of brackets & make a dataframe
-pos_df = pos_df[0].apply(pd.Series)  # remove another set of brackets
-pos_df[0].apply(pd.Series)  # remove last set of brackets
-pos = np.asarray(pos_df)  # back to numpy array
-
-# Separate x and y columns into different dataframes & rename columns
-x = pos_df.iloc[:, ::2]
-x.columns = list_fish
-
-y = pos_df.iloc[:, 1::2]
-y.columns = list_fish
-
-# Manage heading data ---------------------------------------------------------
-# Flatten headings so it is more accessible & add column names
-h = headings.flatten()  # remove one set of brackets & make a dataframe
-head_df = pd.DataFrame(h.flatten())  # remove one set of brackets & make a dataframe
-head_df = head_df[0].apply(pd.Series)  # remove another set of brackets
-head_df[0].apply(pd.Series)  # remove last set of brackets
-
-# Separate x and y columns into different dataframes & rename columns
-head_df.columns = list_fish
+# Separate x and y positions into different dataframes, with y inverted, one
+# row per step and one column per fish
+pos = model.datacollector.get_positions()
+x = pd.DataFrame(pos[:, :, 0], columns=list_fish)
+y = pd.DataFrame(model.space.y_max - pos[:, :, 1], columns=list_fish)
+
+# Heading of each fish in radians, one row per step
+head_df = pd.DataFrame(model.datacollector.get_headings(), columns=list_fish)
+
+# The whole run can also be saved as arrays, i.e. for numpy
+# model.datacollector.save(os.path.join(path, r"trajectories_slope.npz"))
 
 # Todo: select data output to match the version of the model run
 # Export normal run to .csv for import into R ---------------------------------
@@ -2,10 +2,22 @@
 Script for running single_run.py many times and collecting all of the output
 files in a folder so they can be read into R as examples of multiple versions
 of the model run with the same parameters.
+
+Each run is saved to its own file, with the columns named as in the ICHEC
+output read by R (data_collectors.ICHEC_NAMES). With use_ensemble, the runs
+with the full set of data collectors are instead made together as one
+ShoalEnsemble (see shoal_ensemble.py), which is much faster, but moves all of
+the fish at once (simultaneous activation). That changes the summary
+statistics from the random activation of ShoalModel (see
+activation_comparison.py), so it isn't a drop-in replacement for existing
+output.
 """
 
 from shoal_model import *
 from shoal_model_nnd import *
+from shoal_ensemble import ShoalEnsemble
+from data_collectors import ICHEC_NAMES
+import pandas as pd
 import os
 import matplotlib.pyplot as plt
 
@@ -14,11 +26,13 @@ path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data/general
 # path_nnd = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data/NND runs"  # for laptop
 path_priors = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data/prior runs"  # for laptop
 
+use_ensemble = False  # run all of the runs as one ShoalEnsemble (simultaneous activation)
+
 
-def single_run(sd, vs, sp, co, sep, mt, n):
+def single_run(sd, vs, sp, co, sep, mt):
     """
-    Run shoal model n times with fixed parameters values, collect data, and
-    save output as a .csv file with a unique name.
+    Run shoal model once with fixed parameters values, returning the data
+    collected at every step.
     """
     model = ShoalModel(n_fish=20,
                        width=100,
@@ -31,14 +45,38 @@ def single_run(sd, vs, sp, co, sep, mt, n):
                        match=mt)
     for i in range(300):  # number of steps
         model.step()
-    data = model.datacollector.get_model_vars_dataframe()
-    data.columns = ["cent", "nnd", "polar", "area"]
-    data.to_csv(os.path.join(path, r"single_run_"+str(n)+".csv"))
+    return model.datacollector.get_model_vars_dataframe()
+
+
+def ensemble_runs(sd, vs, sp, co, sep, mt, n, folder, name):
+    """
+    Run shoal model n times with fixed parameters values, collect data, and
+    save the output of each run as a .csv file with a unique name.
+    """
+    if use_ensemble:
+        ensemble = ShoalEnsemble(replicates=n,
+                                 n_fish=20,
+                                 width=100,
+                                 height=100,
+                                 speed=sd,
+                                 vision=vs,
+                                 separation=sp,
+                                 cohere=co,
+                                 separate=sep,
+                                 match=mt)
+        ensemble.run(300)  # number of steps
+        data = ensemble.get_model_vars()
+        runs = (pd.DataFrame({collector: data[collector][:, r] for collector in ICHEC_NAMES})
+                for r in range(n))
+    else:
+        runs = (single_run(sd, vs, sp, co, sep, mt) for r in range(n))
+    for r, run in enumerate(runs):
+        run = run[list(ICHEC_NAMES)].rename(columns=ICHEC_NAMES)
+        run.to_csv(os.path.join(folder, name + str(r) + ".csv"))
 
 
 # Run model n times with parameter values determined from the general ABC
-for n in range(100):
-    single_run(2.8, 9.7, 8.1, 0.53, 0.28, 0.54, n)
+ensemble_runs(2.8, 9.7, 8.1, 0.53, 0.28, 0.54, 100, path, r"single_run_")
 
 
 # def single_run_nnd(sd, vs, sp, co, sep, mt, n):
@@ -68,27 +106,5 @@ for n in range(100):
 #     single_run_nnd(9.5, 17.7, 3.9, 0.59, 0.42, 0.50, n)
 
 
-def single_run_priors(sd, vs, sp, co, sep, mt, n):
-    """
-    Run shoal model n times with fixed parameters values, collect data, and
-    save output as a .csv file with a unique name.
-    """
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=sd,
-                       vision=vs,
-                       separation=sp,
-                       cohere=co,
-                       separate=sep,
-                       match=mt)
-    for i in range(300):  # number of steps
-        model.step()
-    data = model.datacollector.get_model_vars_dataframe()
-    data.columns = ["cent", "nnd", "polar", "area"]
-    data.to_csv(os.path.join(path_priors, r"single_run_prior_"+str(n)+".csv"))
-
-
 # Run model n times with mean prior distribution values before ABC
-for n in range(100):
-    single_run_priors(10, 10, 10, 0.5, 0.5, 0.5, n)
+ensemble_runs(10, 10, 10, 0.5, 0.5, 0.5, 100, path_priors, r"single_run_prior_")
@@ -1,27 +1,207 @@
 """
 Script for importing and consolidating files from the ICHEC cluster. The data
-generated on the cluster are output as individual text files, which need to be
-collated into one file to be run through an approximate bayesian computation
-package in R (found in shoal-model-in-R).
-"""
+generated on the cluster are output as one binary shard (.npy) per task by
+ichec_sweep.py, which need to be collated into one file to be run through an
+approximate bayesian computation package in R (found in shoal-model-in-R).
 
-# TODO: Actually get this to work. Broken beyond generating the list of file names.
+The shards are read by a pool of worker processes in two passes:
+    1. Only the header of each shard is read, to check that the file is
+       complete and has the same columns as the others, and to count its
+       records. Shards that can't be read, are cut short, or have different
+       columns are reported as corrupt and left out.
+    2. The records of the good shards are read in the order of their task ids
+       and written straight into the consolidated file, which is a .npy file
+       (memory-mapped, so it never has to fit in memory) or a .csv file for R.
+Only a few shards are read ahead of the one being written, so memory use
+doesn't grow if writing (i.e. the .csv) is slower than reading. Tasks with no
+shard are reported as missing, and tasks that left a .part file (see
+ichec_sweep.save_results) as interrupted. Files with no task id in their name
+are reported and left out. If the prior table is given, rows of it with no
+results, or results from more than one task, are reported. Usage, i.e.:
+    python3 ichec_import.py "output/11Dec2020/output*.npy" allfactors.csv \\
+        --priors priors.npy --tasks modelruns.txt --workers 8
+"""
 
-import pandas as pd
-from glob import glob
+import argparse
 import os
+import re
+import sys
+from collections import deque
+from glob import glob
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+
+
+def task_id(path):
+    """
+    The task id of a shard, from the number at the end of its name (i.e.
+    output12.npy is task 12), or None if its name doesn't end in a number.
+    """
+    match = re.search(r"(\d+)\.npy(\.part)?$", os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def read_header(path):
+    """
+    Reads the header of a .npy shard, returning (path, number of records,
+    dtype, None), or (path, None, None, reason) if it is corrupt.
+    """
+    try:
+        with open(path, "rb") as file:
+            version = np.lib.format.read_magic(file)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+            data_start = file.tell()
+        size = os.path.getsize(path)
+    except (OSError, ValueError) as error:
+        return path, None, None, "unreadable ({})".format(error)
+    if len(shape) != 1 or dtype.names is None:
+        return path, None, None, "not a table of records"
+    if size != data_start + shape[0] * dtype.itemsize:
+        return path, None, None, "cut short ({} of {} bytes)".format(
+            size - data_start, shape[0] * dtype.itemsize)
+    return path, shape[0], dtype, None
+
+
+def load_shard(path):
+    """ The records of a shard. """
+    return np.load(path)
+
+
+def imap_ahead(pool, function, items, ahead):
+    """
+    Like pool.imap(function, items), returning the results in order, but with
+    at most ahead items given to the workers that haven't been returned yet.
+    pool.imap hands out every item at once, so results that are read faster
+    than they are used pile up in memory.
+    """
+    items = iter(items)
+    pending = deque(pool.apply_async(function, (item,)) for item in islice(items, ahead))
+    for item in items:
+        result = pending.popleft().get()
+        pending.append(pool.apply_async(function, (item,)))
+        yield result
+    while pending:
+        yield pending.popleft().get()
+
+
+class Writer:
+    """
+    Writes the records of one shard after another into a .npy file
+    (memory-mapped, with space for all of them) or a .csv file.
+    """
+    def __init__(self, path, dtype, n_records):
+        self.path = path
+        self.count = 0
+        if path.endswith(".csv"):
+            self.array = None
+            self.file = open(path, "w")
+            self.file.write(",".join(dtype.names) + "\n")
+            self.fmt = ["%d" if dtype[name].kind == "i" else "%.17g" for name in dtype.names]
+        else:
+            self.array = np.lib.format.open_memmap(path, mode="w+", dtype=dtype,
+                                                   shape=(n_records,))
+
+    def write(self, records):
+        if self.array is None:
+            np.savetxt(self.file, records, fmt=self.fmt, delimiter=",")
+        else:
+            self.array[self.count:self.count + len(records)] = records
+        self.count += len(records)
+
+    def close(self):
+        if self.array is None:
+            self.file.close()
+        else:
+            self.array.flush()
+
+
+def expected_tasks(tasks_file):
+    """
+    The task ids in a taskfarm task list (modelruns.txt from create_tasks.py),
+    from the shard each task saves its output to.
+    """
+    with open(tasks_file) as file:
+        outputs = re.findall(r"--output\s+(\S+\.npy)", file.read())
+    return {task_id(output) for output in outputs} - {None}
+
+
+def consolidate(shard_paths, output, priors=None, tasks_file=None, workers=1, part_paths=()):
+    """
+    Checks and consolidates the shards into one file, reporting (on stderr)
+    missing, corrupt & interrupted tasks (with a .part file left behind) and,
+    if the prior table is given, any rows of it with no results or with
+    results from more than one task. Returns a dictionary of the problems
+    found.
+    """
+    unnamed = sorted(path for path in list(shard_paths) + list(part_paths)
+                     if task_id(path) is None)
+    shard_paths = sorted((path for path in shard_paths if task_id(path) is not None),
+                         key=task_id)
+    part_paths = [path for path in part_paths if task_id(path) is not None]
+    assert shard_paths, "none of the shards have a task id in their name"
+    with Pool(workers) as pool:
+        headers = pool.map(read_header, shard_paths,
+                           chunksize=max(len(shard_paths) // (4 * workers), 1))
+        corrupt = {task_id(path): reason for path, n, dtype, reason in headers if reason}
+        good = [(path, n, dtype) for path, n, dtype, reason in headers if not reason]
+        assert good, "none of the {} shards could be read".format(len(shard_paths))
+
+        # Columns of the sweep, from the first good shard
+        dtype = good[0][2]
+        for path, n, shard_dtype in good:
+            if shard_dtype != dtype:
+                corrupt[task_id(path)] = "different columns ({})".format(
+                    ", ".join(shard_dtype.names))
+        good = [(path, n) for path, n, shard_dtype in good if shard_dtype == dtype]
+
+        writer = Writer(output, dtype, sum(n for path, n in good))
+        counts = None
+        if priors is not None:
+            rows = np.array(np.load(priors, mmap_mode="r")["row"])
+            counts = np.zeros(rows.max() + 1, dtype=np.int64)
+        # A couple of shards per worker are read ahead of the writer
+        for records in imap_ahead(pool, load_shard, [path for path, n in good], 2 * workers):
+            writer.write(records)
+            if counts is not None:
+                # Each run counted once, as alldata shards have a record per step
+                counts += np.bincount(np.unique(records["row"]),
+                                      minlength=len(counts))[:len(counts)]
+        writer.close()
+
+    found = {task_id(path) for path in shard_paths}
+    expected = expected_tasks(tasks_file) if tasks_file else set(range(max(found) + 1))
+    problems = {"missing tasks": sorted(expected - found),
+                "corrupt tasks": dict(sorted(corrupt.items())),
+                "interrupted tasks": sorted(task_id(path) for path in part_paths),
+                "files with no task id": unnamed,
+                "missing rows": [] if counts is None else rows[counts[rows] == 0].tolist(),
+                "repeated rows": [] if counts is None else rows[counts[rows] > 1].tolist()}
+    print("{} records from {} shards written to {}".format(writer.count, len(good), output),
+          file=sys.stderr)
+    for problem, ids in problems.items():
+        if ids:
+            print("{} {}: {}".format(len(ids), problem, ids), file=sys.stderr)
+    return problems
+
 
-# Generate a list of the separation files in this folder
-sep_files = glob("/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data/ICHEC/30Mar2020/sep_output*.txt")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidate the output shards from ICHEC.")
+    parser.add_argument("shards", help="pattern of the shard files, i.e. \"output/output*.npy\"")
+    parser.add_argument("output", help="file to write to (.npy, or .csv for R)")
+    parser.add_argument("--priors", help="prior table (.npy), to report rows with no results")
+    parser.add_argument("--tasks", help="task list (modelruns.txt), to report missing tasks")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    args = parser.parse_args(argv)
+    shard_paths = glob(args.shards)
+    assert shard_paths, "no shards match {}".format(args.shards)
+    consolidate(shard_paths, args.output, args.priors, args.tasks, args.workers,
+                part_paths=glob(args.shards + ".part"))
 
-# Read all of the files into one list
-sep_data = []
-for f in sep_files:
-    sep_data.append(pd.read_table(f))
-    
-# Turn this list into a pandas dataframe
-big_sep_data = pd.concat(sep_data, ignore_index=True)
 
-# Write the dataframe to a .csv file that can be easily imported into R
-path = "/Users/Sophie/Desktop/"  # for laptop
-big_sep_data.to_csv(os.path.join(path, r"var-sep.csv"), index=False)
+if __name__ == '__main__':
+    main()
@@ -16,14 +16,15 @@ import os
 path = "/Users/Sophie/Desktop/DO NOT ERASE/1NUIG/Mackerel/Mackerel Data"  # for laptop
 
 n = 50  # number of fish
+bins = 25  # number of heatmap cells along each side of the space
 
 
 def run_model(width_prior, vision_prior, separation_prior):
     """
     Runs the shoal model for a certain number of steps with varying
-    parameteters and returns two data frames with the average for the runs
-    when shoaling behaviour has been established, so all dataframes can be
-    stacked together.
+    parameteters and returns the number of fish in each cell of a grid over
+    the space at step 18, once shoaling behaviour has been established. Only
+    the grid is kept, not the positions of the fish.
     """
     model = ShoalModel(n_fish=n,
                        width=width_prior,
@@ -34,31 +35,19 @@ def run_model(width_prior, vision_prior, separation_prior):
                        cohere=0.25,
                        separate=0.25,
                        match=0.3)
-    for i in range(20):  # number of steps to run the model for
+    model.datacollector = DensityHeatmap(width_prior, 50, bins=bins, burn_in=18)  # skip early runs
+    # Data are collected at the start of each step, so the last of 19 steps
+    # adds step 18 only
+    for i in range(19):  # number of steps to run the model for
         model.step()
-    data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data_trim = data.iloc[18:19, ]  # remove early runs
-    np_data = np.asarray(data_trim)
-    # Flatten Positions so it is more accessible & add column names
-    p = np_data.flatten()  # remove one set of brackets & make a dataframe
-    pos_df = pd.DataFrame(p.flatten())  # remove one set of brackets & make a dataframe
-    pos_df = pos_df[0].apply(pd.Series)  # remove another set of brackets
-    pos_df[0].apply(pd.Series)  # remove last set of brackets
-    pos = np.asarray(pos_df)  # back to numpy array
-    return pos_df
+    return model.datacollector.counts
 
 
 # Run model with priors
-positions = run_model(50, 50, 2)
+counts = run_model(50, 50, 2)
 
-# Create unique names for each fish
-list_fish = ["fish" + str(i) for i in range(1, (n + 1))]
+# Heatmap with a row for each y cell (y inverted, as in the positions
+# reporter) and a column for each x cell
+heatmap = pd.DataFrame(counts.T[::-1])
 
-# Separate x and y columns into different dataframes & rename columns
-x = positions.iloc[:, ::2]
-x.columns = list_fish
-
-y = positions.iloc[:, 1::2]
-y.columns = list_fish
-
-print(x)
+print(heatmap)
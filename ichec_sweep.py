@@ -0,0 +1,257 @@
+"""
+Runs the shoal model on the Irish High End Computing Cluster (ICHEC) for a
+block of parameter values (prior draws), all in one Python process. Each task
+on the cluster used to start a new Python for every run of the model (one of
+the ichec_run_*.py scripts), paying for importing mesa, pandas & scipy each
+time for a few hundred milliseconds of model. Here the rows of a prior file
+are run one after the other, or spread over a pool of worker processes, and
+the results for the whole block are written out together.
+
+Each sweep is one of the old run scripts, with the same model, size, number
+of steps & burn-in, and varies some of speed, vision, separation, cohere,
+separate & match, with the others fixed (see SWEEPS):
+    1. allfactors: all six parameters vary.
+    2. boidfactors: cohere, separate & match vary.
+    3. otherfactors: speed, vision & separation vary.
+    4. speed, vision, sep: one parameter varies.
+    5. nnd: all six vary, with only nearest neighbour distance collected.
+    6. alldata: all six vary, with the data collectors kept for every step
+       rather than condensed into summary statistics.
+    7. test: a short run of the nnd model, to check that the cluster works.
+
+For every sweep except alldata, the summary statistics of each run (min, max,
+mean & standard deviation of each data collector after the burn-in, i.e.
+"cent_min", ..., "area_std", named as by the old scripts: see ICHEC_NAMES in
+data_collectors.py) are kept as the model runs (OnlineSummary).
+Every row of output starts with the row id of its parameter values in the
+prior table, followed by the statistics and the parameter values, in the
+columns the old script of the sweep wrote (i.e. separation as "sep" for the
+otherfactors, speed, vision & sep sweeps: see the *_COLUMNS maps).
+
+The results of a block are saved as one binary shard: a structured numpy array
+(.npy) with a record for each row of output, an int64 "row" (and "step") and
+a float64 column for each statistic and parameter, so the columns are the
+same for every shard of a sweep. Shards are written to a temporary file and
+renamed when complete, so an interrupted task never leaves a partial shard.
+Without an output file the results are printed as tab-separated text instead,
+for checking a few runs. Progress is logged on stderr.
+
+The priors are a table saved as a structured numpy array (.npy, written by
+create_tasks.py), with an integer "row" id and a float column named for each
+parameter (i.e. "speed", ..., "match"). Every sweep reads its own columns from
+the same table, and the values are never written out and read back as text.
+Each task reads only its own rows, from a memory-mapped file. Older text prior
+files, with one row of whitespace-separated values per run and a column for
+each varying parameter in the order given in SWEEPS, can still be read.
+
+Every run has its own random seed, made from a base seed (--seed) and the row
+id of its parameter values, for the starting positions & velocities and the
+order the fish move in. Runs on different worker processes (which start with
+copies of the same random state) are then independent, and any row can be run
+again on its own to get the same result.
+
+Usage, i.e. for rows 1000 to 1999 of a prior table, on 4 processes:
+    python3 ichec_sweep.py allfactors priors.npy --start 1000 --stop 2000 \\
+        --workers 4 --output output1.npy
+or for one set of values, with the output printed:
+    python3 ichec_sweep.py allfactors --values 2 10 2 0.3 0.03 0.7
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from shoal_model import ShoalModel
+from shoal_model_nnd import ShoalModel_nnd
+from data_collectors import OnlineSummary, SHORT_NAMES
+from shoal_ensemble import PARAMETERS
+
+# The parameter columns each sweep writes, with the names the old run scripts
+# gave them (as ICHEC_NAMES in data_collectors.py for the statistics), as the
+# R scripts read the columns by these names: all six parameters, only the
+# boid factors, or speed, vision & separation (as "sep").
+ALL_COLUMNS = {name: name for name in PARAMETERS}
+BOID_COLUMNS = {"cohere": "cohere", "separate": "separate", "match": "match"}
+OTHER_COLUMNS = {"speed": "speed", "vision": "vision", "separation": "sep"}
+
+# The sweeps, each replacing one of the ichec_run_*.py scripts
+SWEEPS = {"allfactors": dict(model=ShoalModel, vary=PARAMETERS, steps=300, burn_in=200,
+                             fixed=dict(n_fish=20, width=100, height=100)),
+          "boidfactors": dict(model=ShoalModel, vary=["cohere", "separate", "match"],
+                              steps=300, burn_in=100,
+                              fixed=dict(n_fish=20, width=10, height=10, speed=2, vision=10,
+                                         separation=2),
+                              columns=BOID_COLUMNS),
+          "otherfactors": dict(model=ShoalModel, vary=["speed", "vision", "separation"],
+                               steps=300, burn_in=100,
+                               fixed=dict(n_fish=20, width=50, height=50),
+                               columns=OTHER_COLUMNS),
+          "speed": dict(model=ShoalModel, vary=["speed"], steps=200, burn_in=10,
+                        fixed=dict(n_fish=20, width=50, height=50, vision=10, separation=2),
+                        columns=OTHER_COLUMNS),
+          "vision": dict(model=ShoalModel, vary=["vision"], steps=200, burn_in=10,
+                         fixed=dict(n_fish=20, width=50, height=50, speed=2, separation=2),
+                         columns=OTHER_COLUMNS),
+          "sep": dict(model=ShoalModel, vary=["separation"], steps=200, burn_in=10,
+                      fixed=dict(n_fish=20, width=50, height=50, speed=2, vision=10),
+                      columns=OTHER_COLUMNS),
+          "nnd": dict(model=ShoalModel_nnd, vary=PARAMETERS, steps=300, burn_in=200,
+                      fixed=dict(n_fish=20, width=100, height=100)),
+          "alldata": dict(model=ShoalModel, vary=PARAMETERS, steps=300, burn_in=0,
+                          fixed=dict(n_fish=20, width=50, height=50), every_step=True),
+          "test": dict(model=ShoalModel_nnd, vary=PARAMETERS, steps=30, burn_in=10,
+                       fixed=dict(n_fish=20, width=100, height=100))}
+
+
+def read_priors(path, vary, start=0, stop=None):
+    """
+    Reads rows start to stop of a prior table, returning the row ids and a
+    (rows, parameters) array of the values of the parameters in vary. Tables
+    saved as .npy are memory-mapped, so only those rows are read. Text files
+    have no row ids, so the line numbers are used.
+    """
+    if path.endswith(".npy"):
+        table = np.load(path, mmap_mode="r")[start:stop]
+        values = np.column_stack([table[name] for name in vary])
+        return np.array(table["row"]), values
+    values = np.loadtxt(path, ndmin=2)[start:stop]
+    return np.arange(start, start + len(values)), values
+
+
+def run_seed(seed, row):
+    """
+    The random seed for the run of one row of the priors, from the base seed
+    and the row id.
+    """
+    return int(np.random.SeedSequence([seed, row]).generate_state(1)[0])
+
+
+def run_model(sweep, row, values, seed=0):
+    """
+    Runs the model once for one row of parameter values, returning a list of
+    dictionaries: one with the summary statistics of the run, or one per step
+    for sweeps that keep every step. Each starts with the row number and ends
+    with the parameter values in the sweep's columns (which can include fixed
+    ones, i.e. vision for the speed sweep). The random numbers
+    for the run come from run_seed(seed, row).
+    """
+    settings = SWEEPS[sweep]
+    parameters = dict(zip(settings["vary"], (float(value) for value in values)))
+    # The models draw the fish from the random & np.random modules and order
+    # them with their own random.Random
+    row_seed = run_seed(seed, row)
+    random.seed(row_seed)
+    np.random.seed(row_seed)
+    model = settings["model"](**settings["fixed"], **parameters)
+    model.random.seed(row_seed)
+    every_step = settings.get("every_step", False)
+    if not every_step:
+        model.datacollector = OnlineSummary(model.datacollector.model_reporters,
+                                            burn_in=settings["burn_in"])
+    for step in range(settings["steps"]):
+        model.step()
+    used = dict(settings["fixed"], **parameters)
+    parameters = {column: used[name]
+                  for name, column in settings.get("columns", ALL_COLUMNS).items()}
+    if not every_step:
+        return [dict(row=row, **model.datacollector.summary(), **parameters)]
+    data = model.datacollector.model_vars
+    return [dict([("row", row), ("step", step)] +
+                 [(SHORT_NAMES.get(name, name), column[step]) for name, column in data.items()],
+                 **parameters)
+            for step in range(settings["burn_in"], settings["steps"])]
+
+
+def run_sweep(sweep, rows, values, workers=1, seed=0):
+    """
+    Runs the model for every row of parameter values, on a pool of worker
+    processes if workers > 1, and returns the results of all of them as one
+    list of dictionaries, in the order of the rows.
+    """
+    tasks = [(sweep, int(row), row_values, seed) for row, row_values in zip(rows, values)]
+    if workers > 1:
+        with Pool(workers) as pool:
+            results = pool.starmap(run_model, tasks, chunksize=max(len(tasks) // (4 * workers), 1))
+    else:
+        results = [run_model(*task) for task in tasks]
+    return [result for run in results for result in run]
+
+
+def to_records(results):
+    """
+    The results as a structured array, with a record for each result: int64
+    "row" & "step" columns and a float64 column for everything else.
+    """
+    names = list(results[0])
+    dtype = [(name, np.int64 if name in ("row", "step") else np.float64) for name in names]
+    return np.array([tuple(result[name] for name in names) for result in results], dtype=dtype)
+
+
+def save_results(records, path):
+    """
+    Saves the records to a .npy shard. The shard is written under another
+    name and then renamed, so the file at path is always complete.
+    """
+    part = path + ".part"
+    with open(part, "wb") as file:
+        np.save(file, records)
+    os.replace(part, path)
+
+
+def write_results(results, file):
+    """
+    Writes the results as tab-separated text: the column names, and then a
+    line for each result, with floats written exactly (repr).
+    """
+    if not results:
+        return
+    file.write("\t".join(results[0]) + "\n")
+    for result in results:
+        file.write("\t".join(repr(float(value)) if isinstance(value, float) else str(value)
+                             for value in result.values()) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the shoal model for a block of priors.")
+    parser.add_argument("sweep", choices=sorted(SWEEPS), help="which parameters to vary")
+    parser.add_argument("priors", nargs="?",
+                        help="prior table (.npy) or text file with a row for each run")
+    parser.add_argument("--start", type=int, default=0, help="first row of the priors to run")
+    parser.add_argument("--stop", type=int, default=None, help="row of the priors to stop at")
+    parser.add_argument("--values", type=float, nargs="+",
+                        help="one row of parameter values, instead of a priors file")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--output", help=".npy file to save the results to, instead of printing")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="base random seed, combined with the row id for each run")
+    args = parser.parse_args(argv)
+    n_vary = len(SWEEPS[args.sweep]["vary"])
+
+    if args.values is not None:
+        values = np.array(args.values, ndmin=2)
+        rows = [args.start]
+    else:
+        assert args.priors is not None, "give a priors file or --values"
+        rows, values = read_priors(args.priors, SWEEPS[args.sweep]["vary"],
+                                   args.start, args.stop)
+    assert len(values), "there are no rows of priors from {} to {}".format(args.start, args.stop)
+    assert values.shape[1] == n_vary, \
+        "the {} sweep needs {} parameter values per row".format(args.sweep, n_vary)
+
+    start = time.time()
+    results = run_sweep(args.sweep, rows, values, args.workers, args.seed)
+    if args.output is None:
+        write_results(results, sys.stdout)
+    else:
+        save_results(to_records(results), args.output)
+    print("{}: {} runs (rows {} to {}) in {:.1f} seconds".format(
+        args.sweep, len(values), rows[0], rows[-1], time.time() - start), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -30,7 +30,7 @@ gather & become less organised in one corner.
 import pandas as pd
 import numpy as np
 import os
-from scipy.spatial import KDTree, ConvexHull
+from scipy.spatial import cKDTree, ConvexHull
 import math
 from statsmodels.robust.scale import mad
 import matplotlib.pyplot as plt
@@ -89,21 +89,19 @@ centroid_distance = pd.DataFrame([centroid_dist(s) for s in steps])
 
 
 # Nearest Neighbour Distance
-def nnd(df):
+def nnd(df, k=5, workers=1):
     """
     Computes the average nearest neighbour distance for each object. Finds &
     averages nearest neighbours using a KDTree, a machine learning concept for
     clustering or compartmentalizing data. Can control how many neighbours are
-    considered 'near'.
+    considered 'near' (k). The neighbours of every object are found with one
+    query of the tree, on several threads if workers > 1.
     """
-    fish_tree = KDTree(df)
-    means = []
-    for me in df:
-        neighbors = fish_tree.query(x=me, k=6)  # includes agent @ dist = 0
-        dist = list(neighbors[0])  # select dist from .query output
-        dist.pop(0)  # removes closest agent - itself @ dist = 0
-        means.append(sum(dist) / len(dist))
-    return sum(means) / len(means)
+    k = min(k, len(df) - 1)
+    fish_tree = cKDTree(df)
+    kwargs = {"workers": workers} if workers != 1 else {}
+    dist, idx = fish_tree.query(df, k=k + 1, **kwargs)  # includes object @ dist = 0
+    return np.mean(dist[:, 1:])  # removes closest object - itself @ dist = 0
 
 
 nn_distance = pd.DataFrame([nnd(s) for s in steps])
@@ -0,0 +1,189 @@
+"""
+Array versions of the rules the "Fish" agents follow in shoal_model.py. Rather
+than each agent looping over its own neighbours, the positions and velocities
+of the whole shoal are held in (n_fish, 2) numpy arrays and the cohere,
+separate and match vectors are calculated for every fish at once.
+
+The functions reproduce the mesa ContinuousSpace geometry used by the agents:
+    1. Neighbours are found with the toroidal (wrapping) distance, including
+       fish exactly at the vision radius and excluding any fish at distance 0,
+       as in get_neighbors(pos, vision, False).
+    2. Headings between fish are found as in get_heading, by shifting both
+       points by the centre of the space before taking the difference.
+    3. Fish bounce off the edges of the space as in Fish.avoid_boundaries,
+       and off any solid walls (see walls.py).
+
+Note that mesa's ContinuousSpace keeps its neighbour index in an array with the
+type of the first position placed, which in ShoalModel.make_fish is an integer
+array, so the "agents" engine searches for neighbours on truncated positions.
+These functions always use the actual (float) positions.
+
+The space is assumed to run from 0 to width and 0 to height, as it does in
+ShoalModel. Any leading dimensions of the position and velocity arrays (i.e.
+(replicates, n_fish, 2)) are treated as separate shoals that never see each
+other, and the parameters can be scalars or given per fish.
+"""
+
+import numpy as np
+
+
+def neighbour_pairs(pos, vision, size, torus=True):
+    """
+    Finds every pair of fish (i, j) where j is within the vision radius of i.
+    Returns the indices of i and j into the flattened (-1, 2) position array
+    and the squared distance between them. Pairs are only made within the same
+    shoal when pos has leading (batch) dimensions.
+    """
+    deltas = np.abs(pos[..., np.newaxis, :, :] - pos[..., :, np.newaxis, :])
+    if torus:
+        deltas = np.minimum(deltas, size - deltas)
+    dist2 = deltas[..., 0] ** 2 + deltas[..., 1] ** 2
+    vision = np.asarray(vision, dtype=float)
+    if vision.ndim:  # one radius per shoal or per fish
+        vision = vision.reshape(vision.shape + (1,) * (dist2.ndim - vision.ndim))
+    mask = (dist2 <= vision ** 2) & (dist2 > 0)
+    idx = np.nonzero(mask)
+    n = pos.shape[-2]
+    offset = 0
+    if pos.ndim > 2:  # index into the flattened batch of shoals
+        offset = np.ravel_multi_index(idx[:-2], pos.shape[:-2]) * n
+    return offset + idx[-2], offset + idx[-1], dist2[mask]
+
+
+def headings(pos, size, torus=True):
+    """
+    Shifts positions by the centre of the space so that the heading from i to
+    j is headings[j] - headings[i], matching ContinuousSpace.get_heading.
+    """
+    if torus:
+        return (pos - size / 2) % size
+    return pos
+
+
+def boid_vectors(pos, velocity, i, j, dist2, separation, size, torus=True,
+                 walls=None, vision=None):
+    """
+    Returns the cohere, separate and match vectors for every fish from the
+    neighbour pairs found by neighbour_pairs(), as (-1, 2) arrays in the same
+    order as the flattened positions.
+        1. cohere: mean heading towards the neighbouring fish,
+        2. separate: sum of headings away from any neighbour (fish or
+           wall) closer than the separation distance,
+        3. match: mean velocity of the neighbouring fish.
+    Walls are optional and only enter the separate vector. They need the
+    vision radius to be found.
+    """
+    flat_pos = pos.reshape(-1, 2)
+    flat_velocity = velocity.reshape(-1, 2)
+    n = flat_pos.shape[0]
+    shifted = headings(flat_pos, size, torus)
+    heading = shifted[j] - shifted[i]
+
+    count = np.bincount(i, minlength=n)[:, np.newaxis]
+    has_neighbours = count > 0
+    cohere = sum_by_fish(i, heading, n)
+    np.divide(cohere, count, out=cohere, where=has_neighbours)
+    match = sum_by_fish(i, flat_velocity[j], n)
+    np.divide(match, count, out=match, where=has_neighbours)
+
+    separation = np.asarray(separation, dtype=float)
+    sep_i = separation.ravel()[i] if separation.ndim else separation
+    close = np.sqrt(dist2) < sep_i
+    separate = -sum_by_fish(i[close], heading[close], n)
+    if walls is not None:
+        separate -= walls.repel(flat_pos, vision, separation)
+    return cohere, separate, match
+
+
+def sum_by_fish(i, vectors, n):
+    """
+    Sums the (x, y) vectors belonging to each fish i into an (n, 2) array.
+    """
+    total = np.zeros((n, 2))
+    total[:, 0] = np.bincount(i, vectors[:, 0], n)
+    total[:, 1] = np.bincount(i, vectors[:, 1], n)
+    return total
+
+
+def bounce(pos, velocity, speed, size, out=None, walls=None):
+    """
+    Returns the new positions of the fish, flipping the x or y part of their
+    velocity (in place) where a move would take them past the edge of the
+    space, as in Fish.avoid_boundaries, and then reflecting it off any solid
+    walls. Positions are then wrapped back into the space as
+    ContinuousSpace.torus_adj would. The new positions are written into out
+    if it is given.
+    """
+    speed = np.asarray(speed, dtype=float)
+    if speed.ndim:
+        speed = speed.reshape(-1, 1)
+    new_pos = np.multiply(velocity, speed, out=out)
+    new_pos += pos
+    flip = (new_pos < 0) | (new_pos >= size)
+    velocity[flip] = -velocity[flip]
+    if walls is not None and walls.solid:
+        walls.reflect(pos, velocity, speed)
+    np.multiply(velocity, speed, out=new_pos)
+    new_pos += pos
+    wrap = ((new_pos < 0) | (new_pos >= size)).any(axis=1)
+    if wrap.any():
+        new_pos[wrap] = new_pos[wrap] % size
+    return new_pos
+
+
+def step(pos, velocity, speed, vision, separation, cohere, separate, match,
+         size, torus=True, walls=None, out=None):
+    """
+    Moves every fish one step. All fish read the positions and velocities from
+    the start of the step. The parameters can be scalars or arrays with one
+    value per fish (flattened across any leading dimensions). Returns the new
+    position and velocity arrays in the shape they were given, written into
+    the (pos, velocity) arrays in out if given.
+    """
+    shape = pos.shape
+    i, j, dist2 = neighbour_pairs(pos, _per_shoal(vision, shape), size, torus)
+    return move(pos, velocity, i, j, dist2, speed, vision, separation,
+                cohere, separate, match, size, torus, walls, out)
+
+
+def move(pos, velocity, i, j, dist2, speed, vision, separation,
+         cohere, separate, match, size, torus=True, walls=None, out=None):
+    """
+    Applies the three rules from a set of neighbour pairs, normalises the
+    velocities and moves the fish. Split from step() so the neighbour pairs
+    can come from any neighbour search. The new positions and velocities are
+    written into out, a (pos, velocity) pair of arrays shaped like pos, if
+    given. These must not be the arrays being read.
+    """
+    shape = pos.shape
+    if out is None:
+        out = (np.empty(shape), np.empty(shape))
+    new_pos = out[0].reshape(-1, 2)
+    new_velocity = out[1].reshape(-1, 2)
+    c, s, m = boid_vectors(pos, velocity, i, j, dist2, separation, size, torus,
+                           walls, vision)
+    c *= _column(cohere)
+    c += s * _column(separate)
+    c += m * _column(match)
+    c /= 2
+    np.add(velocity.reshape(-1, 2), c, out=new_velocity)
+    new_velocity /= np.linalg.norm(new_velocity, axis=1)[:, np.newaxis]
+    bounce(pos.reshape(-1, 2), new_velocity, speed, size, out=new_pos, walls=walls)
+    return out
+
+
+def _column(value):
+    """ Per-fish parameters as a column so they scale both parts of a vector. """
+    value = np.asarray(value, dtype=float)
+    return value.reshape(-1, 1) if value.ndim else value
+
+
+def _per_shoal(value, shape):
+    """
+    Vision as the neighbour search expects it: a scalar, or one value per fish
+    reshaped to the leading dimensions of the positions.
+    """
+    value = np.asarray(value, dtype=float)
+    if value.ndim:
+        return value.reshape(shape[:-1])
+    return value
@@ -0,0 +1,180 @@
+"""
+Runs many replicates of the shoal model with the same parameters together.
+Rather than running one mesa ShoalModel after another, the positions and
+velocities of all replicates are held in (replicates, n_fish, 2) arrays and
+moved at once with the array version of the model rules (shoal_arrays.py).
+The replicates never see each other's fish.
+
+Each replicate has its own random number stream for its starting positions and
+velocities, spawned from one seed, so a replicate gives the same run whether
+it is run with 5 or 500 others.
+
+The data collectors are calculated for every replicate at each step, with the
+array versions of the functions in data_collectors.py:
+    1. Polarization: median absolute deviation of agent heading
+    2. Nearest Neighbour Distance: mean distance of the 5 nearest agents
+    3. Shoal Area: convex hull
+    4. Mean Distance from Centroid
+
+As with the "arrays" engine of ShoalModel, all fish move based on the
+positions at the start of each step.
+
+The parameters (speed, vision, separation, cohere, separate, match) can also
+be given as one value per replicate, so that a whole block of prior draws for
+ABC can be run in lock-step as one set of arrays (see run_priors()). Each
+model then gets one row of summary statistics.
+"""
+
+import numpy as np
+import pandas as pd
+
+import shoal_arrays
+from data_collectors import polar_array, nnd_array, area_array, centroid_dist_array, ICHEC_NAMES
+
+PARAMETERS = ["speed", "vision", "separation", "cohere", "separate", "match"]
+
+
+class ShoalEnsemble:
+    """
+    A set of replicates of the shoal model, moved together as one array.
+    Parameters are as for ShoalModel, plus:
+        replicates: number of independent runs of the model.
+        seed: seed for the random number streams of the replicates.
+    speed, vision, separation, cohere, separate and match can each be a single
+    value for all replicates or an array with one value per replicate.
+    """
+    def __init__(self,
+                 replicates=100,
+                 n_fish=20,
+                 width=100,
+                 height=100,
+                 speed=2,
+                 vision=10,
+                 separation=2,
+                 cohere=0.25,
+                 separate=0.025,
+                 match=0.3,
+                 seed=None):
+        assert np.all(np.asarray(speed) < width) and np.all(np.asarray(speed) < height), \
+            "speed can't be greater than model area dimensions"
+        self.replicates = replicates
+        self.n_fish = n_fish
+        self.size = np.array((width, height), dtype=float)
+        self.parameters = {name: np.broadcast_to(np.asarray(value, dtype=float), (replicates,))
+                           for name, value in zip(PARAMETERS, (speed, vision, separation,
+                                                               cohere, separate, match))}
+        # The array rules take one value per fish
+        self.fish_parameters = {name: np.repeat(value, n_fish)
+                                for name, value in self.parameters.items()}
+        streams = np.random.SeedSequence(seed).spawn(replicates)
+        self.rngs = [np.random.default_rng(s) for s in streams]
+        self.steps = 0
+        self.model_vars = {"Polarization": [],
+                           "Nearest Neighbour Distance": [],
+                           "Shoal Area": [],
+                           "Mean Distance from Centroid": []}
+        self.make_fish()
+
+    def make_fish(self):
+        """
+        Random starting positions and velocities for the fish in each
+        replicate, drawn from the replicate's own random number stream over
+        the same ranges as ShoalModel.make_fish().
+        """
+        self.pos = np.empty((self.replicates, self.n_fish, 2))
+        self.velocity = np.empty((self.replicates, self.n_fish, 2))
+        for r, rng in enumerate(self.rngs):
+            self.pos[r, :, 0] = rng.integers(2, self.size[0] - 1, size=self.n_fish)
+            self.pos[r, :, 1] = rng.integers(2, self.size[1] - 1, size=self.n_fish)
+            self.velocity[r] = rng.random((self.n_fish, 2)) * 2 - 1  # [-1.0 .. 1.0, -1.0 .. 1.0]
+
+    def collect(self):
+        """
+        Calculate the data collectors for every replicate at the current step.
+        """
+        self.model_vars["Polarization"].append(polar_array(self.velocity))
+        # Not periodic, as nnd()
+        self.model_vars["Nearest Neighbour Distance"].append(nnd_array(self.pos))
+        self.model_vars["Shoal Area"].append(area_array(self.pos))
+        self.model_vars["Mean Distance from Centroid"].append(
+            centroid_dist_array(self.pos, self.size))
+
+    def step(self, collect=True):
+        """
+        Collect data (as ShoalModel.step does, before moving), then move the
+        fish in every replicate.
+        """
+        if collect:
+            self.collect()
+        p = self.fish_parameters
+        self.pos, self.velocity = shoal_arrays.step(
+            self.pos, self.velocity, p["speed"], p["vision"], p["separation"],
+            p["cohere"], p["separate"], p["match"], self.size)
+        self.steps += 1
+
+    def run(self, steps, burn_in=0):
+        """
+        Run every replicate for a number of steps. Data are not collected for
+        the first burn_in steps.
+        """
+        for step in range(steps):
+            self.step(collect=step >= burn_in)
+
+    def get_model_vars(self):
+        """
+        Returns a dictionary of the data collected, each as a (steps,
+        replicates) array.
+        """
+        return {name: np.asarray(values) for name, values in self.model_vars.items()}
+
+    def get_model_vars_dataframe(self, name):
+        """
+        Returns one of the data collectors as a dataframe with a row for each
+        step collected and a column for each replicate.
+        """
+        return pd.DataFrame(np.asarray(self.model_vars[name]))
+
+    def summary(self, names=ICHEC_NAMES):
+        """
+        Condense the data collected into summary statistics for each
+        replicate: the min, max, mean and standard deviation over the steps
+        collected of every data collector, followed by the parameter values.
+        Returns a dataframe with one row per replicate, with the same columns
+        as the ICHEC run scripts (i.e. "cent_min", ..., "area_std", "speed"),
+        or named by data_collectors.SHORT_NAMES if given as names.
+        """
+        data = self.get_model_vars()
+        columns = {}
+        for stat, function in (("min", np.min), ("max", np.max), ("mean", np.mean)):
+            for name, short in names.items():
+                columns[short + "_" + stat] = function(data[name], axis=0)
+        for name, short in names.items():
+            columns[short + "_std"] = np.std(data[name], axis=0, ddof=1)  # as pandas .std()
+        for name in PARAMETERS:
+            columns[name] = self.parameters[name]
+        return pd.DataFrame(columns)
+
+
+def run_priors(priors, n_fish=20, width=100, height=100, steps=300, burn_in=200, seed=None):
+    """
+    Runs one model for each set of parameter values (prior draw) in priors,
+    all in lock-step, and returns a dataframe of summary statistics with one
+    row per set of parameters, in the same order.
+    Args:
+        priors: dataframe, dictionary or structured array with a column for
+                each of speed, vision, separation, cohere, separate & match.
+        n_fish, width, height: as for ShoalModel.
+        steps: number of steps to run the models for.
+        burn_in: number of steps at the beginning not used in the summary
+                 statistics, as collective behaviour emerges.
+        seed: seed for the random number streams of the models.
+    """
+    values = {name: np.asarray(priors[name], dtype=float) for name in PARAMETERS}
+    ensemble = ShoalEnsemble(replicates=len(values["speed"]),
+                             n_fish=n_fish,
+                             width=width,
+                             height=height,
+                             seed=seed,
+                             **values)
+    ensemble.run(steps, burn_in=burn_in)
+    return ensemble.summary()
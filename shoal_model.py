@@ -12,10 +12,11 @@ These rules are based on the neighbours each agent perceives within their
 (Mann et al. 2011). Another version of this model is being constructed
 for the topological (set number of neighbours at any distance).
 
-The 'fish' can also interact with objects (also agents) that don't move. These
+The 'fish' can also interact with walls that don't move (see walls.py). These
 obstructions can act as borders to the world (i.e. to represent a fish tank) or
-elements in an open environment. Later, I plan to add moving obstructions (i.e.
-a trawl).
+elements in an open environment. They are line segments rather than agents, so
+the schedule and space only hold fish. Later, I plan to add moving obstructions
+(i.e. a trawl).
 
 The model is based on an toroidal (unbounded & wrapping), 2D area. Later
 versions will be 3D, with environmental gradients, and agents with goal-,
@@ -29,21 +30,54 @@ Data are collected in the data_collectors.py script and are:
     3. Shoal Area: convex hull
     4. Mean Distance From Centroid
 
+Data are only collected on the steps that will be used: after a burn-in
+period as collective behaviour emerges, every collect_every steps, or on a
+given set of steps (collect_steps). The data collected can be read with
+ShoalModel.get_model_vars_dataframe, indexed by the step they were collected at.
+
 A visualization of the model in an HTML object is in shoal_model_viz.py. For
 the visualization, the parameters in the ShoalModel class can be changed to run
 based on interactive, user-settable sliders.
+
+The model can be run with two engines:
+    1. "agents": each Fish agent finds its neighbours and moves in turn, in a
+       random order, as above. With activation="simultaneous", all of the fish
+       instead work out their moves from the positions at the end of the last
+       step, and then all move at once (SyncFish).
+    2. "arrays": the positions and velocities of all fish are kept in numpy
+       arrays and the rules are applied to the whole shoal at once (see
+       shoal_arrays.py). All fish move based on the positions at the start of
+       the step. FishView agents can be kept in the schedule as a view on those
+       arrays so that the visualization and data collectors still work.
+       Neighbours are found for the whole shoal at once, either by checking
+       every pair of fish ("dense"), with a grid of cells the size of the
+       vision radius ("cells"), with the model's k-d tree ("kdtree"), or with
+       a Verlet list that is only rebuilt every few steps ("verlet"). See
+       spatial_index.py. The last three are much faster for large shoals.
+
+The model keeps a list of its fish (ShoalModel.fish), separate from anything
+else in the schedule. Once per step, their positions and velocities are read
+into arrays that make up the step's spatial context (see
+ShoalModel.spatial_context and spatial_index.SpatialContext). The k-d tree of
+the fish (with periodic boundaries), the neighbours within the vision radius
+and the convex hull are made from it when first needed and shared by the
+"kdtree" neighbour search, the simultaneously activated fish and the data
+collectors, so each is only found once per step.
 """
 # Todo: figure out how to turn off the torus feature for actual bounded space.
 
 
 import random
 from mesa import Agent, Model
-from mesa.time import RandomActivation
+from mesa.time import RandomActivation, SimultaneousActivation
 from mesa.datacollection import DataCollector
 from mesa.space import ContinuousSpace
 from mesa.visualization.UserParam import UserSettableParameter
 
 from data_collectors import *
+import shoal_arrays
+from spatial_index import CellList, SpatialContext, VerletList
+from walls import Walls
 
 
 class Fish(Agent):
@@ -104,29 +138,47 @@ class Fish(Agent):
         for my_neighbor in my_neighbors:
             if self.model.space.get_distance(me, my_neighbor) < self.separation:
                 separate_vector -= self.model.space.get_heading(me, my_neighbor)
+        walls = getattr(self.model, "walls", None)
+        if walls is not None:
+            separate_vector -= walls.repel(me, self.vision, self.separation)[0]
         return separate_vector
 
-    def avoid_boundaries(self):
+    def avoid_boundaries(self, velocity=None, out=None):
         """
         Returns the new (x,y) position of the agent making sure it bounces off
         the walls instead of looping around the space in a torus. This function
         assumes that the self.velocity vector has been calculated in the step()
         function. If the new x and y co-ordinates go out of bounds we flip the
         corresponding value in the velocity vector (to bounce off the wall) and
-        recalculate the new_position variable.
+        recalculate the new_position variable. Another velocity vector can be
+        given to be used (and flipped) instead of self.velocity. The velocity
+        is then reflected off any solid walls the fish would cross. The new
+        position is written into out if it is given, rather than a new array.
         """
-        new_position = self.pos + self.velocity * self.speed
+        if velocity is None:
+            velocity = self.velocity
+        new_position = np.empty(2) if out is None else out
+        np.multiply(velocity, self.speed, out=new_position)
+        new_position += self.pos
         new_x, new_y = new_position
 
         # If the new position is out of bounds (min & max) on the X-axis
         if (new_x < self.model.space.x_min) or (new_x >= self.model.space.x_max):
-            self.velocity[0] = -self.velocity[0]  # Bounce off the wall on X axis
-            new_position = self.pos + self.velocity * self.speed
+            velocity[0] = -velocity[0]  # Bounce off the wall on X axis
+            np.multiply(velocity, self.speed, out=new_position)
+            new_position += self.pos
 
         # If the new position is out of bounds on the Y-axis
         if (new_y < self.model.space.y_min) or (new_y >= self.model.space.y_max):
-            self.velocity[1] = -self.velocity[1]  # Bounce off the wall on Y axis
-            new_position = self.pos + self.velocity * self.speed
+            velocity[1] = -velocity[1]  # Bounce off the wall on Y axis
+            np.multiply(velocity, self.speed, out=new_position)
+            new_position += self.pos
+
+        walls = getattr(self.model, "walls", None)
+        if walls is not None and walls.solid:
+            walls.reflect(self.pos, velocity[np.newaxis], self.speed)
+            np.multiply(velocity, self.speed, out=new_position)
+            new_position += self.pos
 
         return new_position
 
@@ -160,11 +212,68 @@ class Fish(Agent):
         self.model.space.move_agent(self, new_position)
 
 
+class SyncFish(Fish):
+    """
+    A Fish agent for simultaneous activation. In step(), every fish works out
+    its new velocity and position from the state of all fish at the end of the
+    previous step, and writes them into a second set of arrays. In advance(),
+    the two sets swap over and the fish moves. The arrays are made once, when
+    the fish is created.
+    """
+    def __init__(self, unique_id, model, pos, speed, velocity, vision,
+                 separation, tag="fish", cohere=0.025, separate=0.25, match=0.04):
+        """
+        Create a new Boid (bird, fish) agent. Arguments are as for Fish.
+        """
+        super().__init__(unique_id, model, pos, speed, velocity, vision,
+                         separation, tag, cohere, separate, match)
+        self._velocity_buffers = [np.array(velocity, dtype=float), np.empty(2)]
+        self._pos_buffers = [np.empty(2), np.empty(2)]
+        self._current = 0
+        self.velocity = self._velocity_buffers[0]
+
+    def neighbours(self):
+        """
+        The other fish within vision, at their positions at the end of the
+        previous step. As no fish moves until every fish has stepped, these
+        are read from the model's spatial context, which finds the neighbours
+        of every fish at once, rather than with space.get_neighbors.
+        """
+        context = self.model.spatial_context()
+        return [self.model.fish[j] for j in context.neighbours(self.vision)[self.unique_id]]
+
+    def step(self):
+        """
+        Get the Boid's neighbors and compute the new vector and position,
+        without changing the current ones.
+        """
+        neighbors = self.neighbours()
+        new_velocity = self._velocity_buffers[1 - self._current]
+        new_velocity[:] = self.velocity + (self.cohere(neighbors) * self.cohere_factor +
+                                           self.separate(neighbors) * self.separate_factor +
+                                           self.match_velocity(neighbors) * self.match_factor) / 2
+
+        # Make the new velocity a unit vector
+        new_velocity /= np.linalg.norm(new_velocity)
+
+        # Get the new position and make sure it bounces off the walls
+        self.avoid_boundaries(new_velocity, out=self._pos_buffers[1 - self._current])
+
+    def advance(self):
+        """
+        Swap the new velocity and position in for the current ones and move.
+        """
+        self._current = 1 - self._current
+        self.velocity = self._velocity_buffers[self._current]
+        self.model.space.move_agent(self, self._pos_buffers[self._current])
+
+
 class Obstruct(Agent):
     """
     Immobile objects/obstructions. These agents can be used to create borders
     or other static aspects of the model environment for the "Fish" agents to
-    interact with.
+    interact with. ShoalModel now uses Walls instead (see make_obstructions),
+    but these are still used by the older models in data_handling.
     """
     def __init__(self, unique_id, model, pos, tag="obstruct"):
         """
@@ -183,6 +292,44 @@ class Obstruct(Agent):
         pass
 
 
+class FishView(Fish):
+    """
+    A Fish agent for the "arrays" engine. Its position and velocity are rows of
+    the model's position and velocity arrays, so it always shows the current
+    state of the shoal without moving itself. Used by the visualization and
+    data collectors, which read agent.pos and agent.velocity.
+    """
+    def __init__(self, unique_id, model, index, pos, speed, velocity, vision,
+                 separation, tag="fish", cohere=0.025, separate=0.25, match=0.04):
+        """
+        Create a new view on fish number "index" in the model arrays. Other
+        arguments are as for Fish.
+        """
+        self.index = index
+        super().__init__(unique_id, model, pos, speed, velocity, vision,
+                         separation, tag, cohere, separate, match)
+
+    @property
+    def pos(self):
+        return self.model.pos[self.index]
+
+    @pos.setter
+    def pos(self, value):
+        self.model.pos[self.index] = value
+
+    @property
+    def velocity(self):
+        return self.model.velocity[self.index]
+
+    @velocity.setter
+    def velocity(self, value):
+        self.model.velocity[self.index] = value
+
+    def step(self):
+        """The model moves all of the fish at once."""
+        pass
+
+
 # Interactive sliders for model arguments.
 # Todo: Change "value" argument for initial or testing conditions
 n_slider = UserSettableParameter(param_type='slider', name='Number of Agents',
@@ -210,6 +357,29 @@ class ShoalModel(Model):
                     keep from any other
         cohere, separate, match: factors for the relative importance of
                                  the three drives.
+        engine: "agents" to move each Fish agent in turn, or "arrays" to move
+                the whole shoal at once from numpy arrays.
+        fish_views: for the "arrays" engine, whether to add FishView agents
+                    to the schedule for the visualization.
+        activation: "random" for fish to move one at a time in a random order,
+                    or "simultaneous" for all fish to move based on the
+                    previous step. The "arrays" engine is always
+                    simultaneous, which is the default for it.
+        neighbour_index: for the "arrays" engine, how to find neighbours -
+                         "dense" (all pairs), "cells" (cell list),
+                         "kdtree" (the model's periodic k-d tree) or
+                         "verlet" (Verlet list).
+        verlet_skin: extra distance kept in the Verlet list. The list is
+                     rebuilt when a fish has moved more than half of this
+                     since the last build. Defaults to 4 x speed, so at most
+                     every third step.
+        walls: Walls for the fish to avoid (see walls.py), or None for open
+               water. make_obstructions() sets a border around the space.
+        burn_in: number of steps at the beginning to run without collecting
+                 data, as collective behaviour emerges.
+        collect_every: after the burn-in, collect data every this many steps.
+        collect_steps: the steps to collect data on (i.e. range(200, 300)),
+                       instead of burn_in and collect_every.
     """
     def __init__(self,
                  n_fish=20,
@@ -220,17 +390,56 @@ class ShoalModel(Model):
                  separation=2,
                  cohere=0.25,
                  separate=0.025,
-                 match=0.3):
+                 match=0.3,
+                 engine="agents",
+                 fish_views=True,
+                 activation=None,
+                 neighbour_index="dense",
+                 verlet_skin=None,
+                 walls=None,
+                 burn_in=0,
+                 collect_every=1,
+                 collect_steps=None):
         assert speed < width and speed < height, "speed can't be greater than model area dimensions"
+        assert engine in ("agents", "arrays"), "engine must be 'agents' or 'arrays'"
+        if activation is None:
+            activation = "simultaneous" if engine == "arrays" else "random"
+        assert activation in ("random", "simultaneous"), \
+            "activation must be 'random' or 'simultaneous'"
+        assert engine == "agents" or activation == "simultaneous", \
+            "the arrays engine only has simultaneous activation"
+        assert neighbour_index in ("dense", "cells", "kdtree", "verlet"), \
+            "neighbour_index must be 'dense', 'cells', 'kdtree' or 'verlet'"
+        assert burn_in >= 0 and collect_every >= 1, \
+            "burn_in can't be negative and collect_every must be at least 1"
         self.n_fish = n_fish
         self.vision = vision
         self.speed = speed
         self.separation = separation
-        self.schedule = RandomActivation(self)
+        self.activation = activation
+        if self.activation == "simultaneous":
+            self.schedule = SimultaneousActivation(self)
+        else:
+            self.schedule = RandomActivation(self)
         self.space = ContinuousSpace(width, height, torus=True)
         self.factors = dict(cohere=cohere, separate=separate, match=match)
+        self.engine = engine
+        self.fish_views = fish_views
+        self.neighbour_index = neighbour_index
+        self.verlet_skin = 4 * speed if verlet_skin is None else verlet_skin
+        self.fish = []  # the fish agents (or FishViews), without any other agents
+        self._context = None
+        self._context_step = None
+        self.walls = walls
+        self.burn_in = burn_in
+        self.collect_every = collect_every
+        self.collect_steps = None if collect_steps is None else frozenset(collect_steps)
+        self.collected_steps = []  # the steps that data were collected on
         # self.make_obstructions()  # Todo: un-comment this line to include obstructions
-        self.make_fish()
+        if self.engine == "arrays":
+            self.make_fish_arrays()
+        else:
+            self.make_fish()
         self.running = True
 
     def make_fish(self):
@@ -244,46 +453,161 @@ class ShoalModel(Model):
             y = random.randrange(2, (self.space.y_max - 1))
             pos = np.array((x, y))
             velocity = np.random.random(2) * 2 - 1  # [-1.0 .. 1.0, -1.0 .. 1.0]
-            fish = Fish(i, self, pos, self.speed, velocity, self.vision,
-                        self.separation, **self.factors)
+            fish_type = SyncFish if self.activation == "simultaneous" else Fish
+            fish = fish_type(i, self, pos, self.speed, velocity, self.vision,
+                             self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish.append(fish)
 
+        # Polarization, Nearest Neighbour Distance, Shoal Area & Mean Distance
+        # from Centroid, calculated together each step
         self.datacollector = DataCollector(
             # model_reporters={"test": test})
-            model_reporters={"Polarization": polar,
-                             "Nearest Neighbour Distance": nnd,
-                             "Shoal Area": area,
-                             "Mean Distance from Centroid": centroid_dist})
-                             # "Positions": positions,
-                             # "Center of Mass": center_mass})
+            model_reporters=SummaryStats().reporters())
+            # model_reporters={"Positions": positions,
+            #                  "Center of Mass": center_mass})
+
+    def make_fish_arrays(self):
+        """
+        Create the position and velocity arrays for the "arrays" engine, with
+        the same random starting positions and velocities as make_fish(). If
+        fish_views is True, a FishView agent is added to the schedule for each
+        fish for the visualization. The data collectors read the arrays
+        directly (see fish_arrays), so work with or without the views.
+        """
+        self.pos = np.empty((self.n_fish, 2))
+        self.velocity = np.empty((self.n_fish, 2))
+        # Second set of arrays for the new positions & velocities each step
+        self._next_pos = np.empty((self.n_fish, 2))
+        self._next_velocity = np.empty((self.n_fish, 2))
+        for i in range(self.n_fish):
+            x = random.randrange(2, (self.space.x_max - 1))
+            y = random.randrange(2, (self.space.y_max - 1))
+            self.pos[i] = (x, y)
+            self.velocity[i] = np.random.random(2) * 2 - 1  # [-1.0 .. 1.0, -1.0 .. 1.0]
+        if self.neighbour_index == "cells":
+            self.cells = CellList(self.vision, self.space.size, self.space.torus)
+        elif self.neighbour_index == "verlet":
+            self.verlet = VerletList(self.vision, self.verlet_skin,
+                                     self.space.size, self.space.torus)
+
+        if self.fish_views:
+            for i in range(self.n_fish):
+                fish = FishView(i, self, i, self.pos[i], self.speed, self.velocity[i],
+                                self.vision, self.separation, **self.factors)
+                self.schedule.add(fish)
+                self.fish.append(fish)
+
+        self.datacollector = DataCollector(
+            model_reporters=SummaryStats().reporters())
 
     def make_obstructions(self):
         """
-        Create N "Obstruct" agents, with set positions & no movement. Borders
-        are defined as coordinate points between the maximum and minimum extent
-        of the width/height of the obstruction. These ranges are drawn from the
-        model space limits, with a slight buffer.
-
-        The obstruction agents are then generated for every point along the
-        defined borders.
-        """
-        # if the space is square (i.e. y_max and x_max are the same):
-        max_lim = self.space.x_max - 1
-        min_lim = self.space.x_min + 1
-        line = range(min_lim, max_lim)
-        borders = np.asarray([(min_lim, n) for n in line] + [(n, max_lim) for n in line] +
-                             [(max_lim, n) for n in line] + [(n, min_lim) for n in line])
-        x_points = np.ndarray.tolist(borders[:, 0])
-        y_points = np.ndarray.tolist(borders[:, 1])
-        points = list(zip(x_points, y_points))
-
-        for i in points:  # create obstruction agent for all points along the borders
-            pos = np.array(i)
-            obstruct = Obstruct(i, self, pos)
-            self.space.place_agent(obstruct, pos)
-            self.schedule.add(obstruct)
+        Create walls around the model space, as the borders of a fish tank.
+        The walls are drawn from the model space limits, with a slight buffer.
+        Fish avoid and bounce off them (see walls.py).
+        """
+        self.walls = Walls.border(self.space.x_max, self.space.y_max, buffer=1)
+
+    def spatial_context(self):
+        """
+        Returns the SpatialContext of the fish for the current step, which
+        makes the k-d tree, neighbour pairs and convex hull of the fish when
+        they are first asked for and keeps them until the fish next move. A
+        new context is made each time the step count changes. With the
+        "arrays" engine it holds the model's own arrays. With the "agents"
+        engine the arrays are read from the fish in self.fish, and as fish
+        with random activation move one at a time during schedule.step(), it
+        holds the positions from the start of the step.
+        """
+        if self._context is None or self._context_step != self.schedule.steps:
+            if self.engine == "arrays":
+                pos, velocity = self.pos, self.velocity
+            else:
+                pos = np.array([fish.pos for fish in self.fish], dtype=float).reshape(-1, 2)
+                velocity = np.array([fish.velocity for fish in self.fish],
+                                    dtype=float).reshape(-1, 2)
+            self._context = SpatialContext(pos, velocity, self.space.size, self.space.torus)
+            self._context_step = self.schedule.steps
+        return self._context
+
+    def neighbour_tree(self):
+        """
+        Returns a NeighbourTree of the current fish positions, with periodic
+        boundaries if the space is a torus, from the step's spatial context.
+        """
+        return self.spatial_context().tree()
+
+    def fish_arrays(self):
+        """
+        Returns the positions and velocities of the fish as (n_fish, 2)
+        arrays, for the data collectors, from the step's spatial context.
+        They shouldn't be changed.
+        """
+        context = self.spatial_context()
+        return context.pos, context.velocity
+
+    @property
+    def neighbour_rebuilds(self):
+        """
+        Number of times the neighbours of the fish have been searched for
+        from scratch. Only the Verlet list skips steps; every other search is
+        rebuilt each step.
+        """
+        if self.engine == "arrays" and self.neighbour_index == "verlet":
+            return self.verlet.rebuilds
+        return self.schedule.steps
+
+    def collecting(self):
+        """
+        Whether data are collected on the current step.
+        """
+        step = self.schedule.steps
+        if self.collect_steps is not None:
+            return step in self.collect_steps
+        return step >= self.burn_in and (step - self.burn_in) % self.collect_every == 0
+
+    def get_model_vars_dataframe(self):
+        """
+        The data collected, as from the DataCollector, but indexed by the
+        step each row was collected at.
+        """
+        data = self.datacollector.get_model_vars_dataframe()
+        data.index = self.collected_steps
+        return data
 
     def step(self):
-        self.datacollector.collect(self)
-        self.schedule.step()
+        if self.collecting():
+            self.datacollector.collect(self)
+            self.collected_steps.append(self.schedule.steps)
+        if self.engine == "arrays":
+            self.step_arrays()
+        else:
+            self.schedule.step()
+
+    def step_arrays(self):
+        """
+        Move all of the fish at once with the "arrays" engine. The new
+        positions and velocities are written into the second set of arrays,
+        which then swap with the current ones. The schedule's step count is
+        kept up to date as if the agents had been stepped.
+        """
+        if self.neighbour_index == "cells":
+            i, j, dist2 = self.cells.pairs(self.pos)
+        elif self.neighbour_index == "kdtree":
+            i, j, dist2 = self.spatial_context().pairs(self.vision)
+        elif self.neighbour_index == "verlet":
+            i, j, dist2 = self.verlet.pairs(self.pos)
+        else:
+            i, j, dist2 = shoal_arrays.neighbour_pairs(self.pos, self.vision,
+                                                       self.space.size, self.space.torus)
+        shoal_arrays.move(
+            self.pos, self.velocity, i, j, dist2, self.speed, self.vision, self.separation,
+            self.factors["cohere"], self.factors["separate"], self.factors["match"],
+            self.space.size, self.space.torus, self.walls,
+            out=(self._next_pos, self._next_velocity))
+        self.pos, self._next_pos = self._next_pos, self.pos
+        self.velocity, self._next_velocity = self._next_velocity, self.velocity
+        self.schedule.steps += 1
+        self.schedule.time += 1
@@ -5,7 +5,8 @@ This is a version of the shoaling model (shoal_model.py). The changes are:
     2. obstructions are in place to represent either permeable barrier (such
        as a thermocline) or an impermeable barrier (representing a sloped ocean
        bottom) and the agent starting positions are either above or below that
-       barrier.
+       barrier. The barriers are walls (see walls.py) rather than lines of
+       obstruction agents, so the fish only have each other as neighbours.
 """
 
 
@@ -17,6 +18,7 @@ from mesa.space import ContinuousSpace
 from mesa.visualization.UserParam import UserSettableParameter
 
 from data_collectors import *
+from walls import Walls
 
 
 class Fish(Agent):
@@ -77,6 +79,8 @@ class Fish(Agent):
         for my_neighbor in my_neighbors:
             if self.model.space.get_distance(me, my_neighbor) < self.separation:
                 separate_vector -= self.model.space.get_heading(me, my_neighbor)
+        if self.model.walls is not None:
+            separate_vector -= self.model.walls.repel(me, self.vision, self.separation)[0]
         return separate_vector
 
     def avoid_boundaries(self):
@@ -86,7 +90,8 @@ class Fish(Agent):
         assumes that the self.velocity vector has been calculated in the step()
         function. If the new x and y co-ordinates go out of bounds we flip the
         corresponding value in the velocity vector (to bounce off the wall) and
-        recalculate the new_position variable.
+        recalculate the new_position variable. The velocity is then reflected
+        off any solid walls (i.e. the slope) that the fish would cross.
         """
         new_position = self.pos + self.velocity * self.speed
         new_x, new_y = new_position
@@ -101,6 +106,10 @@ class Fish(Agent):
             self.velocity[1] = -self.velocity[1]  # Bounce off the wall on Y axis
             new_position = self.pos + self.velocity * self.speed
 
+        if self.model.walls is not None and self.model.walls.solid:
+            self.model.walls.reflect(self.pos, self.velocity[np.newaxis], self.speed)
+            new_position = self.pos + self.velocity * self.speed
+
         return new_position
 
     def match_velocity(self, neighbors):
@@ -202,6 +211,7 @@ class ShoalModel(Model):
         self.schedule = RandomActivation(self)
         self.space = ContinuousSpace(width, height, torus=True)
         self.factors = dict(cohere=cohere, separate=separate, match=match)
+        self.walls = None
         self.make_obstructions()  # Todo: un-comment this line to include obstructions
         self.make_fish()
         self.running = True
@@ -235,30 +245,25 @@ class ShoalModel(Model):
 
     def make_obstructions(self):
         """
-        Create N "Obstruct" agents, with set positions & no movement.  In this
-        case, the obstructions form a line to represent an environmental
-        variable such as a thermo- or halocline.
+        Create the walls, with set positions & no movement. In this case, the
+        walls form a line to represent an environmental variable such as a
+        thermo- or halocline, or a sloped ocean bottom.
         """
         # Todo: select type of line desired & change starting agent positions
         max_lim = self.space.x_max - 1
         min_lim = self.space.x_min + 1
-        horizontal = np.linspace(start=min_lim, stop=max_lim, num=20000)
-
-        # Create a horizontal line with a set number of points - thermocline
-        # border = np.asarray([(n, 25) for n in horizontal])
-        # x_points = np.ndarray.tolist(border[:, 0])
-        # y_points = np.ndarray.tolist(border[:, 1])
-        # points = list(zip(x_points, y_points))
-
-        # Create a diagonal line with a set number of points - slope
-        lift = np.linspace(start=max_lim, stop=30, num=20000)
-        points = np.asarray(list(zip(horizontal, lift)) +
-                            [(max_lim, n) for n in np.linspace(start=30, stop=49, num=10000)])
-        for i in points:  # create obstruction agent for all points along the borders
-            pos = np.array(i)
-            obstruct = Obstruct(i, self, pos)
-            self.space.place_agent(obstruct, pos)
-            self.schedule.add(obstruct)
+
+        # The walls push as hard as the lines of Obstruct agents they replace:
+        # 20000 along the thermocline or the slope and 10000 up the edge.
+
+        # Create a horizontal line that fish can pass through - thermocline
+        # self.walls = Walls.from_points([(min_lim, 25), (max_lim, 25)], solid=False,
+        #                                density=20000 / (max_lim - min_lim))
+
+        # Create a diagonal line & a vertical line to the edge - slope
+        slope = np.hypot(max_lim - min_lim, max_lim - 30)
+        self.walls = Walls.from_points([(min_lim, max_lim), (max_lim, 30), (max_lim, max_lim)],
+                                       density=(20000 / slope, 10000 / (max_lim - 30)))
 
     def step(self):
         self.datacollector.collect(self)
@@ -47,20 +47,31 @@ class SimpleCanvas(VisualizationElement):
         self.js_code = "elements.push(" + new_element + ");"
 
     def render(self, model):
-        """ Creates the space in which the agents exist. """
+        """ Creates the space in which the agents (and any walls) exist. """
         space_state = []
         for obj in model.schedule.agents:
             portrayal = self.portrayal_method(obj)
-            x, y = obj.pos
-            x = ((x - model.space.x_min) /
-                 (model.space.x_max - model.space.x_min))
-            y = ((y - model.space.y_min) /
-                 (model.space.y_max - model.space.y_min))
-            portrayal["x"] = x
-            portrayal["y"] = y
+            portrayal["x"], portrayal["y"] = self.scale(model, obj.pos)
             space_state.append(portrayal)
+        walls = getattr(model, "walls", None)
+        if walls is not None:
+            for start, end in walls.segments:
+                portrayal = wall_draw(walls)
+                portrayal["x"], portrayal["y"] = self.scale(model, start)
+                portrayal["x2"], portrayal["y2"] = self.scale(model, end)
+                space_state.append(portrayal)
         return space_state
 
+    @staticmethod
+    def scale(model, pos):
+        """ Position in the space as a fraction of the canvas. """
+        x, y = pos
+        x = ((x - model.space.x_min) /
+             (model.space.x_max - model.space.x_min))
+        y = ((y - model.space.y_min) /
+             (model.space.y_max - model.space.y_min))
+        return x, y
+
 
 def agent_draw(agent):
     """
@@ -98,6 +109,18 @@ def agent_draw(agent):
     return portrayal
 
 
+def wall_draw(walls):
+    """
+    Defines how the walls are drawn in the model visualization: solid walls
+    as red lines and walls the fish can pass through in grey.
+    """
+    return {
+        "shape": "line",
+        "color": "red" if walls.solid else "grey",
+        "width": 2,
+    }
+
+
 # Create canvas, 500x500 pixels
 shoal_canvas = SimpleCanvas(agent_draw)
 model_params = {
@@ -17,6 +17,8 @@ let ContinuousVisualization = function(height, width, context) {
                this.drawCircle(a.x, a.y, a.r, a.color, a.filled);
             if (agent.shape === "triangle")
                this.drawTriangle(a.x, a.y, a.w, a.h, a.heading, a.color, a.filled);
+            if (agent.shape === "line")
+               this.drawLine(a.x, a.y, a.x2, a.y2, a.color, a.width);
 
             // Draw a circle around the agent to show the visual range it has
             if (agent.showVisionRange) {
@@ -77,6 +79,19 @@ let ContinuousVisualization = function(height, width, context) {
             context.strokeRect(x0, y0, dx, dy);
     };
 
+    this.drawLine = function(x, y, x2, y2, color, lineWidth) {
+        context.save();
+        context.beginPath();
+        context.moveTo(x * width, y * height);
+        context.lineTo(x2 * width, y2 * height);
+
+        context.strokeStyle = color;
+        context.lineWidth = lineWidth;
+        context.stroke();
+        context.restore();
+        context.beginPath();
+    };
+
     this.drawTriangle = function(x, y, w, h, heading, color, fill) {
         // Increase the width by a bit so it's relatively consistent in size
         // of a circle of radians of 3. The value 3 here below is just arbitrary
@@ -0,0 +1,351 @@
+"""
+Neighbour searches for the "arrays" engine of the shoal model. Each of these
+is built once per step from the (n_fish, 2) position array and returns every
+pair of fish within the vision radius in one call, in the same form as
+shoal_arrays.neighbour_pairs(): the indices of each fish (i) and its neighbour
+(j), and the squared distance between them.
+
+Distances are toroidal (wrapping) when torus=True, as in the mesa
+ContinuousSpace, and the space runs from 0 to width and 0 to height. The pairs
+are always returned sorted by i and then j, as the all-pairs search gives
+them, so that every search adds up the neighbours of a fish in the same order
+and gives exactly the same model run.
+
+The searches are:
+    1. CellList: a uniform grid of cells the size of the vision radius.
+    2. NeighbourTree: a compiled k-d tree (scipy cKDTree) with periodic
+       boundaries, which also answers k-nearest-neighbour queries for the
+       data collectors and topological neighbour rules.
+    3. VerletList: keeps the pairs within the vision radius plus a "skin"
+       distance and reuses them over several steps, as fish move at most
+       their speed each step.
+
+SpatialContext holds everything found from the positions of the fish at one
+step (the k-d tree, the neighbour pairs within a radius, the k nearest
+neighbours and the convex hull), each made the first time it is asked for, so
+that the fish and the data collectors share them.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree, ConvexHull
+
+
+def torus_dist2(a, b, size, torus=True):
+    """
+    Squared distance between the points in a and b, accounting for toroidal
+    space in the same way as ContinuousSpace.get_neighbors.
+    """
+    deltas = np.abs(a - b)
+    if torus:
+        deltas = np.minimum(deltas, size - deltas)
+    return deltas[..., 0] ** 2 + deltas[..., 1] ** 2
+
+
+def sorted_pairs(i, j, dist2):
+    """
+    Sorts neighbour pairs by i and then j.
+    """
+    order = np.lexsort((j, i))
+    return i[order], j[order], dist2[order]
+
+
+def ragged_arange(starts, lengths):
+    """
+    Concatenation of arange(start, start + length) for each start and length,
+    without a Python loop.
+    """
+    lengths = np.asarray(lengths)
+    total = lengths.sum()
+    ends = np.cumsum(lengths)
+    within = np.arange(total) - np.repeat(ends - lengths, lengths)
+    return np.repeat(starts, lengths) + within
+
+
+class CellList:
+    """
+    Uniform grid ("cell list") neighbour search. The space is divided into
+    cells at least as wide as the vision radius, so the neighbours of a fish
+    can only be in its own cell or the 8 around it. With the cells wrapping
+    around the edges when torus=True, finding all pairs costs time in
+    proportion to the number of fish rather than its square.
+    """
+    def __init__(self, vision, size, torus=True):
+        """
+        Create a new cell list.
+        Args:
+            vision: radius to search for neighbours within.
+            size: (width, height) of the space.
+            torus: whether the edges of the space wrap around.
+        """
+        self.vision = vision
+        self.size = np.asarray(size, dtype=float)
+        self.torus = torus
+        self.n_cells = None
+        self.order = None
+        self.starts = None
+        self.counts = None
+        self.cells = None
+
+    def grid_shape(self, n_points):
+        """
+        Number of cells along x and y. Cells are no narrower than the vision
+        radius, and there are never many more cells than fish so that empty
+        cells don't dominate for small shoals in a large space.
+        """
+        if self.vision > 0:
+            n_cells = np.maximum(np.floor(self.size / self.vision), 1).astype(int)
+        else:
+            n_cells = np.array([1, 1])
+        limit = max(int(np.sqrt(4 * n_points)), 1)
+        return np.minimum(n_cells, limit)
+
+    def build(self, pos):
+        """
+        Sort the fish into cells. Called once per step, before pairs().
+        """
+        self.n_cells = self.grid_shape(len(pos))
+        cell_size = self.size / self.n_cells
+        cells = np.floor(pos / cell_size).astype(int)
+        cells = np.clip(cells, 0, self.n_cells - 1)
+        self.cells = cells
+        cell_id = cells[:, 0] * self.n_cells[1] + cells[:, 1]
+        self.order = np.argsort(cell_id, kind="mergesort")
+        self.counts = np.bincount(cell_id, minlength=self.n_cells.prod())
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def offsets(self, axis):
+        """
+        Cells to look in along one axis, relative to a fish's own cell. With
+        fewer than 3 cells that wrap around, every cell is visited only once.
+        """
+        if self.torus and self.n_cells[axis] < 3:
+            return range(self.n_cells[axis])
+        return (-1, 0, 1)
+
+    def pairs(self, pos, keep_coincident=False):
+        """
+        Returns (i, j, dist2) for every pair of fish within the vision radius,
+        building the cells from pos first. Pairs of fish at exactly the same
+        position are left out, as in get_neighbors, unless keep_coincident.
+        """
+        self.build(pos)
+        i_parts, j_parts = [], []
+        fish = np.arange(len(pos))
+        for dx in self.offsets(0):
+            for dy in self.offsets(1):
+                other = self.cells + (dx, dy)
+                if self.torus:
+                    other %= self.n_cells
+                    inside = np.ones(len(pos), dtype=bool)
+                else:
+                    inside = ((other >= 0) & (other < self.n_cells)).all(axis=1)
+                other_id = other[inside, 0] * self.n_cells[1] + other[inside, 1]
+                lengths = self.counts[other_id]
+                i_parts.append(np.repeat(fish[inside], lengths))
+                j_parts.append(self.order[ragged_arange(self.starts[other_id], lengths)])
+        i = np.concatenate(i_parts)
+        j = np.concatenate(j_parts)
+        dist2 = torus_dist2(pos[i], pos[j], self.size, self.torus)
+        if keep_coincident:
+            keep = (dist2 <= self.vision ** 2) & (i != j)
+        else:
+            keep = (dist2 <= self.vision ** 2) & (dist2 > 0)
+        return sorted_pairs(i[keep], j[keep], dist2[keep])
+
+
+class NeighbourTree:
+    """
+    A k-d tree of fish positions, with periodic boundaries (scipy's boxsize)
+    when the space is a torus so that distances wrap around the edges. Built
+    once per step and queried for every fish at once.
+    """
+    def __init__(self, pos, size, torus=True):
+        """
+        Create a new tree.
+        Args:
+            pos: (n_fish, 2) array of positions.
+            size: (width, height) of the space.
+            torus: whether the edges of the space wrap around.
+        """
+        self.pos = np.asarray(pos, dtype=float)
+        self.size = np.asarray(size, dtype=float)
+        self.torus = torus
+        self.tree = cKDTree(self.pos, boxsize=self.size if torus else None)
+
+    def query(self, k, workers=1):
+        """
+        Distances to and indices of the k nearest other fish for every fish,
+        as (n_fish, k) arrays. The closest point returned by the tree, the
+        fish itself at distance 0, is left out. workers > 1 runs the query on
+        several threads (scipy 1.6 or newer).
+        """
+        kwargs = {"workers": workers} if workers != 1 else {}
+        dist, idx = self.tree.query(self.pos, k=k + 1, **kwargs)
+        return dist[:, 1:], idx[:, 1:]
+
+    def nearest(self, workers=1):
+        """
+        Distance to and index of the nearest other fish for every fish. Unlike
+        query(k=1), a fish at exactly the same position as another is never
+        given itself.
+        """
+        kwargs = {"workers": workers} if workers != 1 else {}
+        dist, idx = self.tree.query(self.pos, k=2, **kwargs)
+        first_is_self = idx[:, 0] == np.arange(len(self.pos))
+        return (np.where(first_is_self, dist[:, 1], dist[:, 0]),
+                np.where(first_is_self, idx[:, 1], idx[:, 0]))
+
+    def query_ball_point(self, r, workers=1):
+        """
+        For every fish, a list of the indices of all fish within distance r,
+        including the fish itself.
+        """
+        kwargs = {"workers": workers} if workers != 1 else {}
+        return self.tree.query_ball_point(self.pos, r, **kwargs)
+
+    def pairs(self, r):
+        """
+        Returns (i, j, dist2) for every pair of fish within distance r, in the
+        same form as CellList.pairs(). The tree is searched a fraction further
+        than r so that pairs exactly at the radius are always kept.
+        """
+        half = self.tree.query_pairs(r * (1 + 1e-9), output_type="ndarray")
+        i = np.concatenate((half[:, 0], half[:, 1]))
+        j = np.concatenate((half[:, 1], half[:, 0]))
+        dist2 = torus_dist2(self.pos[i], self.pos[j], self.size, self.torus)
+        keep = (dist2 <= r ** 2) & (dist2 > 0)
+        return sorted_pairs(i[keep], j[keep], dist2[keep])
+
+
+class VerletList:
+    """
+    Verlet neighbour list. Stores every pair of fish within vision + skin of
+    each other, and each step only checks the distances of those pairs. The
+    list is rebuilt (with a CellList) once any fish has moved more than half
+    of the skin distance since the last build, as until then no fish outside
+    the list can have come within the vision radius. A larger skin means
+    fewer rebuilds but more pairs to check every step.
+    """
+    def __init__(self, vision, skin, size, torus=True):
+        """
+        Create a new Verlet list.
+        Args:
+            vision: radius to search for neighbours within.
+            skin: extra distance kept in the list.
+            size: (width, height) of the space.
+            torus: whether the edges of the space wrap around.
+        """
+        self.vision = vision
+        self.skin = skin
+        self.size = np.asarray(size, dtype=float)
+        self.torus = torus
+        self.cells = CellList(vision + skin, size, torus)
+        self.rebuilds = 0  # number of times the list has been built
+        self.built_pos = None
+        self.i = None
+        self.j = None
+
+    def needs_rebuild(self, pos):
+        """
+        Whether any fish has moved more than half the skin distance since the
+        list was built.
+        """
+        if self.built_pos is None or len(pos) != len(self.built_pos):
+            return True
+        moved2 = torus_dist2(pos, self.built_pos, self.size, self.torus)
+        return moved2.max(initial=0) > (self.skin / 2) ** 2
+
+    def build(self, pos):
+        """
+        Find all pairs within vision + skin, including fish at the same
+        position, which can move apart.
+        """
+        self.i, self.j, dist2 = self.cells.pairs(pos, keep_coincident=True)
+        self.built_pos = np.array(pos, dtype=float)
+        self.rebuilds += 1
+
+    def pairs(self, pos):
+        """
+        Returns (i, j, dist2) for every pair of fish within the vision radius,
+        rebuilding the list first if needed.
+        """
+        if self.needs_rebuild(pos):
+            self.build(pos)
+        dist2 = torus_dist2(pos[self.i], pos[self.j], self.size, self.torus)
+        keep = (dist2 <= self.vision ** 2) & (dist2 > 0)
+        return self.i[keep], self.j[keep], dist2[keep]
+
+
+class SpatialContext:
+    """
+    The positions and velocities of the fish at one step, and the spatial
+    structures found from them. Each structure is only made the first time it
+    is asked for and then kept, so everything that needs the neighbours or
+    the hull during a step shares one search. A new context is made whenever
+    the fish move (see ShoalModel.spatial_context); the arrays it is given
+    shouldn't be changed while it is in use.
+    """
+    def __init__(self, pos, velocity, size, torus=True):
+        """
+        Create a new context.
+        Args:
+            pos: (n_fish, 2) array of positions.
+            velocity: (n_fish, 2) array of velocities.
+            size: (width, height) of the space.
+            torus: whether the edges of the space wrap around.
+        """
+        self.pos = pos
+        self.velocity = velocity
+        self.size = np.asarray(size, dtype=float)
+        self.torus = torus
+        self._tree = None
+        self._pairs = {}
+        self._neighbours = {}
+        self._query = {}
+        self._hull = None
+
+    def tree(self):
+        """
+        The NeighbourTree of the positions.
+        """
+        if self._tree is None:
+            self._tree = NeighbourTree(self.pos, self.size, self.torus)
+        return self._tree
+
+    def pairs(self, r):
+        """
+        Returns (i, j, dist2) for every pair of fish within distance r, as
+        NeighbourTree.pairs().
+        """
+        if r not in self._pairs:
+            self._pairs[r] = self.tree().pairs(r)
+        return self._pairs[r]
+
+    def neighbours(self, r):
+        """
+        For every fish, an array of the indices of the other fish within
+        distance r, in order, leaving out any fish at the same position (as
+        ContinuousSpace.get_neighbors with include_center=False).
+        """
+        if r not in self._neighbours:
+            i, j, dist2 = self.pairs(r)
+            counts = np.bincount(i, minlength=len(self.pos))
+            self._neighbours[r] = np.split(j, np.cumsum(counts)[:-1])
+        return self._neighbours[r]
+
+    def query(self, k, workers=1):
+        """
+        Distances to and indices of the k nearest other fish for every fish,
+        as NeighbourTree.query().
+        """
+        if k not in self._query:
+            self._query[k] = self.tree().query(k, workers)
+        return self._query[k]
+
+    def hull(self):
+        """
+        The convex hull (scipy ConvexHull) of the positions.
+        """
+        if self._hull is None:
+            self._hull = ConvexHull(self.pos)
+        return self._hull
@@ -24,18 +24,16 @@ data = model.datacollector.get_model_vars_dataframe()
 # # get matplotlib's pcolormesh to work for me to create a heatmap of density,
 # # rather than a scatter plot.
 #
-# # Separate data from data collectors into numpy arrays so they can be accessed more easily
-# np_data = np.asarray(data)
-#
-# position = np_data[:, 4].flatten()  # select position data, remove one set of brackets & make a dataframe
-# pos_df = pd.DataFrame(position.flatten())  # remove one set of brackets & make a dataframe
-# pos_df = pos_df[0].apply(pd.Series)  # remove another set of brackets
-# pos_df[0].apply(pd.Series)  # remove last set of brackets
-# np_pos = np.asarray(pos_df)  # back to numpy array
-#
-# # isolate x and y positions
-# x = np_pos[:, 0::2]
-# y = np_pos[:, 1::2]
+# # Record the positions of the fish into an array with one row per step
+# model = ShoalModel()
+# model.datacollector = TrajectoryRecorder(model.n_fish, steps=5)
+# for i in range(5):
+#     model.step()
+# np_pos = model.datacollector.get_positions()
+#
+# # isolate x and y positions, with y inverted
+# x = np_pos[:, :, 0]
+# y = model.space.y_max - np_pos[:, :, 1]
 #
 #
 # # # Plotting
@@ -0,0 +1,9 @@
+"""
+The model scripts are run from the top of the repository and import each
+other directly (i.e. from shoal_model import ShoalModel), so the tests do too.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
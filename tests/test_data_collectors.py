@@ -0,0 +1,167 @@
+"""
+Tests of the data collectors in data_collectors.py against the versions they
+replaced.
+"""
+
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from scipy.spatial import ConvexHull, KDTree
+
+import data_collectors
+from data_collectors import (polar_array, median_abs_deviation, StepStats, NeighbourStats,
+                             neighbour_stats, HullArea, hull_candidates)
+
+
+# POLARIZATION ----------------------------------------------------------------
+def baseline_polar(velocity):
+    """ polar() as it was, with math.atan2 and statsmodels' mad. """
+    mad = pytest.importorskip("statsmodels.robust.scale").mad
+    angle = [math.atan2(y, x) for x, y in velocity]
+    return mad(np.asarray(angle), center=np.median)
+
+
+def test_median_abs_deviation_matches_statsmodels():
+    mad = pytest.importorskip("statsmodels.robust.scale").mad
+    rng = np.random.default_rng(0)
+    for n in range(1, 60):
+        angle = rng.uniform(-np.pi, np.pi, n)
+        assert median_abs_deviation(angle) == mad(angle, center=np.median)
+
+
+def test_polar_matches_baseline():
+    # np.arctan2 can differ from math.atan2 in the last bit, so the values
+    # agree to within a few ulp of the angles rather than exactly
+    rng = np.random.default_rng(1)
+    for n in range(1, 60):
+        velocity = rng.random((n, 2)) * 2 - 1
+        assert polar_array(velocity) == pytest.approx(baseline_polar(velocity), rel=0, abs=1e-14)
+
+
+# SHARED STATISTICS -----------------------------------------------------------
+class ModelNumber(StepStats):
+    """ The number of the model, calculated once per step. """
+    names = ("number",)
+
+    def calculate(self, model):
+        return {"number": model.number}
+
+
+class Model:
+    """ Just enough of a model for StepStats. """
+    def __init__(self, number):
+        self.schedule = SimpleNamespace(steps=0)
+        self.number = number
+
+
+def test_step_stats_not_shared_between_models():
+    # A model made after another is freed can get the same memory (and id),
+    # at the same step, as in the sweep & sensitivity scripts. The cache must
+    # only ever hold values for a live model that is the one asked about.
+    stats = ModelNumber()
+    first, second = Model(1), Model(2)
+    assert stats(first)["number"] == 1
+    assert stats(second)["number"] == 2
+    assert stats(first)["number"] == 1
+    del first, second
+    assert stats._model() is None  # the cache doesn't keep a model alive
+    for number in range(3, 10):
+        model = Model(number)
+        assert stats(model)["number"] == number
+        del model
+
+
+def test_neighbour_stats_match_a_fresh_calculation():
+    from shoal_model import ShoalModel
+    for run in range(5):
+        model = ShoalModel(n_fish=10, width=50, height=50)
+        for step in range(3):
+            assert neighbour_stats(model) == NeighbourStats().calculate(model)
+            model.step()
+
+
+# ONLINE SUMMARY --------------------------------------------------------------
+def test_online_summary_keeps_ichec_columns():
+    # The ICHEC run scripts summarised the DataCollector with pandas and
+    # named the columns by position, which the R scripts still read
+    import pandas as pd
+    from shoal_model import ShoalModel
+    from data_collectors import OnlineSummary
+    model = ShoalModel(n_fish=10, width=50, height=50)
+    reporters = model.datacollector.model_reporters
+    summary = OnlineSummary(reporters, burn_in=5)
+    for step in range(20):
+        summary.collect(model)
+        model.datacollector.collect(model)
+        model.schedule.step()
+    data = model.datacollector.get_model_vars_dataframe().iloc[5:, ]
+    baseline = pd.concat([data.min(axis=0), data.max(axis=0), data.mean(axis=0),
+                          data.std(axis=0)], axis=0)
+    baseline.index = ["cent_min", "nnd_min", "polar_min", "area_min",
+                      "cent_max", "nnd_max", "polar_max", "area_max",
+                      "cent_mean", "nnd_mean", "polar_mean", "area_mean",
+                      "cent_std", "nnd_std", "polar_std", "area_std"]
+    result = summary.summary()
+    assert list(result) == list(baseline.index)
+    assert np.allclose(list(result.values()), baseline.values, rtol=1e-12)
+
+
+# SHOAL AREA ------------------------------------------------------------------
+@pytest.mark.parametrize("pos", [[[1, 1]],
+                                 [[1, 1], [2, 2]],
+                                 [[1, 1], [2, 2], [3, 3], [4, 4]],
+                                 [[5, 5]] * 10])
+def test_hull_area_without_a_hull_is_zero(pos):
+    hull = HullArea()
+    assert hull.calculate(np.array(pos, dtype=float)) == 0.0
+    assert hull.vertices is None
+
+
+def test_hull_area_matches_convex_hull_over_steps():
+    rng = np.random.default_rng(2)
+    pos = rng.normal(size=(2000, 2)) * 20
+    hull = HullArea()
+    for step in range(10):
+        pos += rng.normal(size=pos.shape)
+        assert hull.calculate(pos) == pytest.approx(ConvexHull(pos).area, rel=1e-12)
+
+
+def test_hull_area_seed_is_capped(monkeypatch):
+    # Fish all on the hull (i.e. a ring) would otherwise seed a pass over the
+    # fish for every one of them
+    angle = np.linspace(0, 2 * np.pi, 5000, endpoint=False)
+    pos = np.column_stack((np.cos(angle), np.sin(angle))) * 50
+    seeds = []
+
+    def candidates(pos, seed=None):
+        seeds.append(seed)
+        return hull_candidates(pos, seed)
+    monkeypatch.setattr(data_collectors, "hull_candidates", candidates)
+    hull = HullArea()
+    for step in range(3):
+        assert hull.calculate(pos) == pytest.approx(ConvexHull(pos).area, rel=1e-12)
+    assert seeds[0] is None
+    assert all(len(seed) <= HullArea.max_seed for seed in seeds[1:])
+
+
+# NEAREST NEIGHBOUR DISTANCE --------------------------------------------------
+def baseline_nnd(pos):
+    """ nnd() as it was, with a query of the tree for each fish. """
+    tree = KDTree(pos)
+    return np.mean([np.mean(tree.query(x=me, k=6)[0][1:]) for me in pos])
+
+
+def test_nnd_matches_baseline_for_every_model():
+    # Fish near the edges of the space would be closer if distances wrapped
+    from shoal_model import ShoalModel
+    from shoal_model_nnd import ShoalModel_nnd
+    from data_collectors import nnd
+    for model_class in (ShoalModel, ShoalModel_nnd):
+        model = model_class(n_fish=20, width=20, height=20)
+        for step in range(5):
+            pos = np.array([agent.pos for agent in model.schedule.agents
+                            if agent.tag == "fish"], dtype=float)
+            assert nnd(model) == pytest.approx(baseline_nnd(pos), rel=1e-12)
+            model.step()
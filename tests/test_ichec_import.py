@@ -0,0 +1,70 @@
+"""
+Tests of the consolidation of the output shards from ICHEC (ichec_import.py).
+"""
+
+from multiprocessing import Pool
+
+import numpy as np
+
+from ichec_import import consolidate, imap_ahead, task_id
+from ichec_sweep import save_results
+
+DTYPE = [("row", np.int64), ("cent_min", np.float64), ("speed", np.float64)]
+
+
+def write_shard(path, rows):
+    records = np.zeros(len(rows), dtype=DTYPE)
+    records["row"] = rows
+    records["speed"] = np.asarray(rows) / 10
+    save_results(records, str(path))
+
+
+def test_consolidate_reports_problems(tmp_path):
+    priors = np.zeros(50, dtype=[("row", np.int64), ("speed", np.float64)])
+    priors["row"] = np.arange(50)
+    np.save(str(tmp_path / "priors.npy"), priors)
+    for n in (0, 1, 3):
+        write_shard(tmp_path / "output{}.npy".format(n), range(n * 10, n * 10 + 10))
+    write_shard(tmp_path / "output4.npy", range(0, 10))  # rows of task 0 again
+    data = (tmp_path / "output1.npy").read_bytes()
+    (tmp_path / "output5.npy").write_bytes(data[:-8])  # cut short
+    (tmp_path / "output6.npy.part").write_bytes(data[:100])
+    write_shard(tmp_path / "output_old.npy", range(5))
+
+    shards = [str(path) for path in tmp_path.glob("output*.npy")]
+    parts = [str(path) for path in tmp_path.glob("output*.npy.part")]
+    for output in ("all.npy", "all.csv"):
+        problems = consolidate(shards, str(tmp_path / output), str(tmp_path / "priors.npy"),
+                               workers=2, part_paths=parts)
+        assert problems["missing tasks"] == [2]
+        assert list(problems["corrupt tasks"]) == [5]
+        assert problems["interrupted tasks"] == [6]
+        assert problems["files with no task id"] == [str(tmp_path / "output_old.npy")]
+        assert problems["missing rows"] == list(range(20, 30)) + list(range(40, 50))
+        assert problems["repeated rows"] == list(range(10))
+
+    result = np.load(str(tmp_path / "all.npy"))
+    assert result["row"].tolist() == (list(range(20)) + list(range(30, 40)) + list(range(10)))
+    csv = np.genfromtxt(str(tmp_path / "all.csv"), delimiter=",", names=True)
+    assert np.array_equal(csv["speed"], result["speed"])
+
+
+def test_task_id():
+    assert task_id("out/output12.npy") == 12
+    assert task_id("out/output12.npy.part") == 12
+    assert task_id("out/output.npy") is None
+
+
+def test_imap_ahead_is_ordered_and_bounded():
+    taken = []
+
+    def items():
+        for item in range(-20, 0):
+            taken.append(item)
+            yield item
+    with Pool(2) as pool:
+        results = imap_ahead(pool, abs, items(), 3)
+        assert next(results) == 20
+        # The first item, and only 3 more handed out to the workers
+        assert len(taken) == 4
+        assert list(results) == list(range(19, 0, -1))
@@ -0,0 +1,45 @@
+"""
+Tests of the sweep runner for the ICHEC cluster (ichec_sweep.py).
+"""
+
+import random
+
+import numpy as np
+
+from ichec_sweep import SWEEPS, run_sweep, run_model
+
+VALUES = [2, 10, 2, 0.25, 0.025, 0.3]
+
+
+def run_from_state(state, row):
+    """ Runs one row after setting the global random state, as in a worker. """
+    random.seed(state)
+    np.random.seed(state)
+    return run_model("test", row, VALUES)
+
+
+def test_runs_do_not_depend_on_the_process_random_state():
+    # Worker processes start with copies of the same random state
+    assert run_from_state(0, 3) == run_from_state(1, 3)
+    assert run_from_state(0, 3) != run_from_state(0, 4)
+
+
+def test_runs_on_workers_are_independent_and_reproducible():
+    values = np.tile(VALUES, (4, 1))
+    results = run_sweep("test", range(4), values, workers=2)
+    summaries = {tuple(result.values())[1:] for result in results}
+    assert len(summaries) == 4
+    assert run_model("test", 2, values[2]) == [results[2]]
+    assert run_model("test", 2, values[2], seed=1) != [results[2]]
+
+
+def test_parameter_columns_are_named_as_by_the_old_scripts(monkeypatch):
+    for sweep in ["allfactors", "boidfactors", "sep"]:
+        monkeypatch.setitem(SWEEPS[sweep], "steps", 20)
+        monkeypatch.setitem(SWEEPS[sweep], "burn_in", 10)
+    columns = lambda sweep, values: list(run_model(sweep, 0, values)[0])
+    assert columns("allfactors", VALUES)[-6:] == ["speed", "vision", "separation",
+                                                  "cohere", "separate", "match"]
+    assert columns("boidfactors", VALUES[3:])[-3:] == ["cohere", "separate", "match"]
+    assert columns("boidfactors", VALUES[3:])[-4] == "area_std"
+    assert columns("sep", [2])[-3:] == ["speed", "vision", "sep"]
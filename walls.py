@@ -0,0 +1,169 @@
+"""
+Walls (obstructions) for the shoal model, as straight line segments rather
+than a cloud of "Obstruct" agents. A wall is not an agent: it is not in the
+schedule or the space, so it adds nothing to each fish's neighbour search.
+Instead the fish find their distance to each wall directly:
+    1. Separation: a fish closer to a wall than its separation distance (and
+       within its vision) steers away from the part of that wall within that
+       distance, in the same way it steers away from close neighbours. The
+       wall pushes as hard as the line of Obstruct agents it replaces (one
+       every density units along it) did, as the sum of the headings to
+       those points is found exactly, as an integral along the wall.
+    2. Reflection: a fish whose next move would cross a solid wall bounces off
+       it, with its velocity reflected about the line of the wall.
+Walls that aren't solid (i.e. a thermocline) are only avoided, and fish that
+come too close can still pass through.
+
+A border (i.e. a fish tank) is four walls, and a line or polygon of any shape
+is one wall per side, so the cost of an obstructed run barely changes from an
+open-water run. The walls are in the coordinates of the space and don't wrap
+around the edges of a torus.
+"""
+
+import numpy as np
+
+
+class Walls:
+    """
+    A set of straight walls, each from one (x, y) point to another.
+    """
+    def __init__(self, segments, solid=True, density=1):
+        """
+        Create a new set of walls.
+        Args:
+            segments: (n_walls, 2, 2) array of the two ends of each wall.
+            solid: whether fish bounce off the walls (i.e. a tank wall or the
+                   sea bottom) or can pass through them (i.e. a thermocline).
+            density: number of Obstruct agents per unit length that the walls
+                     stand in for, which sets how hard they push fish away,
+                     for all walls or one value per wall. The border of
+                     ShoalModel had one per unit.
+        """
+        self.segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        self.solid = solid
+        self.density = np.broadcast_to(np.asarray(density, dtype=float), (len(self.segments),))
+        self.start = self.segments[:, 0]
+        self.direction = self.segments[:, 1] - self.segments[:, 0]
+        self.length2 = (self.direction ** 2).sum(axis=1)
+        assert np.all(self.length2 > 0), "walls must have two different ends"
+
+    @classmethod
+    def from_points(cls, points, closed=False, solid=True, density=1):
+        """
+        Walls along a line through a list of (x, y) points. If closed, the
+        last point joins back to the first to make a polygon.
+        """
+        points = np.asarray(points, dtype=float)
+        ends = np.roll(points, -1, axis=0) if closed else points[1:]
+        starts = points if closed else points[:-1]
+        return cls(np.stack((starts, ends), axis=1), solid, density)
+
+    @classmethod
+    def border(cls, width, height, buffer=1, solid=True, density=1):
+        """
+        Four walls around the edge of a width x height space, buffer in from
+        the edges, as in ShoalModel.make_obstructions.
+        """
+        low_x, low_y = buffer, buffer
+        high_x, high_y = width - buffer, height - buffer
+        return cls.from_points([(low_x, low_y), (low_x, high_y), (high_x, high_y),
+                                (high_x, low_y)], closed=True, solid=solid, density=density)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def closest_points(self, pos):
+        """
+        The closest point on every wall to every fish, as an (n_fish, n_walls,
+        2) array, and the squared distances to them as (n_fish, n_walls).
+        """
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        offset = pos[:, np.newaxis, :] - self.start
+        t = (offset * self.direction).sum(axis=2) / self.length2
+        np.clip(t, 0, 1, out=t)
+        closest = self.start + t[..., np.newaxis] * self.direction
+        dist2 = ((closest - pos[:, np.newaxis, :]) ** 2).sum(axis=2)
+        return closest, dist2
+
+    def repel(self, pos, vision, separation):
+        """
+        Sum of the headings from each fish to the points along every wall
+        that are within both its vision and its separation distance, as an
+        (n_fish, 2) array, with density points per unit length of wall. Fish
+        subtract this from their separate vector. The sum is the integral of
+        the heading along the part of each wall within that distance, so it
+        grows as a fish gets closer to the wall and more of it is in range.
+        vision and separation can be scalars or one value per fish.
+        """
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        vision = np.asarray(vision, dtype=float).reshape(-1, 1)
+        separation = np.asarray(separation, dtype=float).reshape(-1, 1)
+        radius = np.minimum(vision, separation)
+        length = np.sqrt(self.length2)
+        unit = self.direction / length[:, np.newaxis]
+        offset = self.start - pos[:, np.newaxis, :]  # fish to the start of each wall
+        # Distance along each wall to the point nearest the fish, and from
+        # the fish to the line of the wall
+        along = -(offset * unit).sum(axis=2)
+        across2 = (offset ** 2).sum(axis=2) - along ** 2
+        half = np.sqrt(np.maximum(radius ** 2 - across2, 0))
+        low = np.clip(along - half, 0, length)
+        high = np.clip(along + half, 0, length)
+        covered = high - low  # length of each wall within range
+        heading = (covered[..., np.newaxis] * offset +
+                   ((high ** 2 - low ** 2) / 2)[..., np.newaxis] * unit)
+        return (self.density[:, np.newaxis] * heading).sum(axis=1)
+
+    def crossings(self, pos, new_pos):
+        """
+        For each fish moving from pos to new_pos, the index of the first
+        wall the move crosses, or -1 if it crosses none. A move that ends on
+        a wall counts as crossing it; one that starts on a wall and moves
+        away doesn't.
+        """
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        move = new_pos - pos
+        start = self.start - pos[:, np.newaxis, :]  # wall ends relative to the fish
+        end = start + self.direction
+        side_before = _cross(self.direction, -start)
+        side_after = _cross(self.direction, move[:, np.newaxis, :] - start)
+        a = _cross(move[:, np.newaxis, :], start)
+        b = _cross(move[:, np.newaxis, :], end)
+        crossed = (side_before != 0) & (side_before * side_after <= 0) & (a * b <= 0)
+        # Fraction of the move made before reaching each wall
+        with np.errstate(divide="ignore", invalid="ignore"):
+            along = np.where(crossed, side_before / (side_before - side_after), np.inf)
+        first = np.argmin(along, axis=1)
+        return np.where(crossed.any(axis=1), first, -1)
+
+    def reflect(self, pos, velocity, speed, passes=4):
+        """
+        Reflects (in place) the velocity of any fish whose next move, of
+        velocity * speed, would cross a solid wall, so that it bounces off
+        the wall instead. A fish that would still cross a wall after a few
+        reflections (i.e. into a corner) turns back the way it came. Does
+        nothing if the walls aren't solid.
+        """
+        if not self.solid:
+            return
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        speed = np.asarray(speed, dtype=float)
+        if speed.ndim:
+            speed = speed.reshape(-1, 1)
+        original = velocity.copy()
+        for attempt in range(passes + 1):
+            wall = self.crossings(pos, pos + velocity * speed)
+            hit = wall >= 0
+            if not hit.any():
+                return
+            if attempt == passes:
+                velocity[hit] = -original[hit]
+                return
+            d = self.direction[wall[hit]] / np.sqrt(self.length2[wall[hit]])[:, np.newaxis]
+            v = velocity[hit]
+            velocity[hit] = 2 * (v * d).sum(axis=1)[:, np.newaxis] * d - v
+
+
+def _cross(a, b):
+    """ z part of the cross product of (x, y) vectors. """
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]